@@ -3,40 +3,95 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import random
+import copy
 from collections import deque
-from model import DQN, ReplayBuffer
+from model import DQN, ReplayBuffer, PrioritizedReplayBuffer, MemmapReplayBuffer
+from profiler import NULL_PROFILER
 import numpy as np
 
+def spawnSeeds(seed, count):
+    """count independent child seeds derived from seed (all None when seed is None)."""
+    if seed is None:
+        return [None] * count
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(count)]
+
 class DQNAgent:
-    def __init__(self, stateDim, actionDim, lr=0.001, gamma=0.99, epsilon=1.0, epsilonDecay=0.995, epsilonMin=0.01):
-        """Initialize the DQN agent with hyperparameters."""
+    def __init__(self, stateDim, actionDim, lr=0.001, gamma=0.99, epsilon=1.0, epsilonDecay=0.995, epsilonMin=0.01, bufferSize=10000,
+                 prioritized=False, priorityAlpha=0.6, priorityBeta=0.4, tau=None, compile=False,
+                 seed=None, replayDir=None):
+        """Initialize the DQN agent with hyperparameters.
+
+        tau=None keeps the hard target-network copy every updateTargetEvery updates; a float
+        switches to a soft (Polyak) update after every gradient step. compile=True runs the
+        TD-target and loss computation through torch.compile. seed fixes the agent's own RNG
+        streams (exploration, replay sampling, weight init) without touching global state.
+        replayDir keeps the replay buffer in memory-mapped files there (see MemmapReplayBuffer).
+        """
         self.stateDim = stateDim
         self.actionDim = actionDim
         self.gamma = gamma
         self.epsilon = epsilon
         self.epsilonDecay = epsilonDecay
         self.epsilonMin = epsilonMin
-        #self.memory = deque(maxlen=10000)
-        self.replayBuffer = ReplayBuffer(10000)
-        self.model = DQN(stateDim, actionDim)
-        self.targetModel = DQN(stateDim, actionDim)
-        self.targetModel.load_state_dict(self.model.state_dict())
-        self.optimizer = optim.Adam(self.model.parameters(), lr=lr)
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # One child seed per consumer so no two streams ever start from the same state
+        actSeed, batchSeed, bufferSeed, initSeed = spawnSeeds(seed, 4)
+        self.rng = random.Random(actSeed)
+        self.npRng = np.random.default_rng(batchSeed)
+        #self.memory = deque(maxlen=10000)
+        self.prioritized = prioritized
+        if replayDir and prioritized:
+            raise ValueError("Prioritized replay is not supported with an on-disk replay store")
+        if replayDir:
+            self.replayBuffer = MemmapReplayBuffer(bufferSize, stateDim, replayDir, device=self.device, seed=bufferSeed)
+        elif prioritized:
+            self.replayBuffer = PrioritizedReplayBuffer(bufferSize, stateDim, device=self.device,
+                                                        alpha=priorityAlpha, beta=priorityBeta, seed=bufferSeed)
+        else:
+            self.replayBuffer = ReplayBuffer(bufferSize, stateDim, device=self.device, seed=bufferSeed)
+        if initSeed is None:
+            self.model = DQN(stateDim, actionDim)
+        else:
+            with torch.random.fork_rng(devices=[]):
+                torch.manual_seed(initSeed)
+                self.model = DQN(stateDim, actionDim)
+        self.targetModel = copy.deepcopy(self.model)  # A fresh DQN would draw from the global torch RNG
         self.model.to(self.device)
         self.targetModel.to(self.device)
+        self.targetModel.requires_grad_(False)  # Only ever written by updateTargetModel
+        # Fused Adam does the whole parameter update in one kernel (CPU and CUDA)
+        self.optimizer = optim.Adam(self.model.parameters(), lr=lr, fused=True)
+        self.lossFn = nn.MSELoss()
+        self.computeLoss = torch.compile(self.tdLoss) if compile else self.tdLoss
+        self.tau = tau
         self.updateTargetEvery = 1000
         self.stepCounter = 0
+        self.profiler = NULL_PROFILER  # Swap in a profiler.Profiler to time the training stages
+        self.recordStats = False  # Set to accumulate loss/Q-value statistics for popTrainStats
+        self.statsCount = 0
 
     def act(self, state):
         """Choose an action using epsilon-greedy policy."""
-        if random.random() < self.epsilon:
-            return random.randrange(self.actionDim)
+        if self.rng.random() < self.epsilon:
+            return self.rng.randrange(self.actionDim)
         state = torch.FloatTensor(state).unsqueeze(0).to(self.device)
         with torch.no_grad():
             qValues = self.model(state)
         return qValues.argmax().item()
 
+    def actBatch(self, states):
+        """Choose one epsilon-greedy action per row of an (N, stateDim) array with a single forward pass."""
+        states = np.asarray(states, dtype=np.float32)
+        count = states.shape[0]
+        explore = self.npRng.random(count) < self.epsilon
+        actions = self.npRng.integers(self.actionDim, size=count)
+        if not explore.all():
+            with torch.inference_mode():
+                qValues = self.model(torch.from_numpy(states).to(self.device))
+            greedy = qValues.argmax(dim=1).cpu().numpy()
+            actions = np.where(explore, actions, greedy)
+        return actions
+
     """def remember(self, state, action, reward, nextState, done):
         Store experience in replay memory.
         self.memory.append((state, action, reward, nextState, done))"""
@@ -46,26 +101,32 @@ class DQNAgent:
         if len(self.replayBuffer) < batchSize:
             #print("Not enough samples to train")
             return
-        batch = self.replayBuffer.sample(batchSize)
-        # Unpack batch
-        states, actions, rewards, nextStates, dones = zip(*batch)
-        #print(f"Training")
-        states = torch.FloatTensor(np.array(states)).to(self.device)
-        actions = torch.LongTensor(actions).to(self.device)
-        rewards = torch.FloatTensor(rewards).to(self.device)
-        nextStates = torch.FloatTensor(np.array(nextStates)).to(self.device)
-        dones = torch.FloatTensor(dones).to(self.device)
-
-        qValues = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
-        nextQValues = self.targetModel(nextStates).max(1)[0]
-        targetQ = rewards + (1 - dones) * self.gamma * nextQValues
+        profiler = self.profiler
+        # Batch arrives as ready-made tensors on self.device
+        with profiler.section("replay.sample"):
+            if self.prioritized:
+                states, actions, rewards, nextStates, dones, weights, indices = self.replayBuffer.sample(batchSize)
+            else:
+                states, actions, rewards, nextStates, dones = self.replayBuffer.sample(batchSize)
 
-        loss = nn.MSELoss()(qValues, targetQ)#.detach())
-        self.optimizer.zero_grad()
-        loss.backward()
-        self.optimizer.step()
+        with profiler.section("train.forward"):
+            if self.prioritized:
+                loss, tdErrors, qValues = self.computeLoss(states, actions, rewards, nextStates, dones, weights)
+                self.replayBuffer.update_priorities(indices, tdErrors.detach().cpu().numpy())
+            else:
+                loss, _, qValues = self.computeLoss(states, actions, rewards, nextStates, dones)
+            if self.recordStats:
+                self.accumulateStats(loss, qValues)
+        with profiler.section("train.backward"):
+            self.optimizer.zero_grad(set_to_none=True)
+            loss.backward()
+        with profiler.section("train.optimizer"):
+            self.optimizer.step()
+        profiler.count("updates")
         self.stepCounter += 1
-        if self.stepCounter % self.updateTargetEvery == 0:
+        if self.tau is not None:
+            self.softUpdateTargetModel(self.tau)
+        elif self.stepCounter % self.updateTargetEvery == 0:
             self.updateTargetModel()
             #print(f"Updated target model at step {self.stepCounter}")
         if self.epsilon > self.epsilonMin:
@@ -73,9 +134,54 @@ class DQNAgent:
 
         #self.epsilon = max(self.epsilonMin, self.epsilon * self.epsilonDecay)
 
+    def tdLoss(self, states, actions, rewards, nextStates, dones, weights=None):
+        """TD targets and loss for one batch; returns (loss, tdErrors, qValues of the taken actions).
+
+        The target network runs outside autograd, so backward only walks the online model.
+        """
+        qValues = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
+        targetQ = rewards + (1 - dones) * self.gamma * self.targetModel(nextStates).max(1)[0].detach()
+        tdErrors = targetQ - qValues
+        if weights is None:
+            loss = self.lossFn(qValues, targetQ)
+        else:
+            # Importance-sampling weights correct for the non-uniform sampling
+            loss = (weights * tdErrors.pow(2)).mean()
+        return loss, tdErrors, qValues
+
+    @torch.no_grad()
+    def accumulateStats(self, loss, qValues):
+        # Kept as device tensors so recording never forces a sync; read out by popTrainStats
+        stats = torch.stack((loss, qValues.mean(), qValues.max()))
+        if self.statsCount == 0:
+            self.statsSum = stats.clone()
+            self.statsMax = stats.clone()
+        else:
+            self.statsSum += stats
+            torch.maximum(self.statsMax, stats, out=self.statsMax)
+        self.statsCount += 1
+
+    def popTrainStats(self):
+        """Loss and Q-value statistics over the updates since the last call (needs recordStats=True)."""
+        if self.statsCount == 0:
+            return {"updates": 0}
+        (lossSum, qMeanSum, _), (lossMax, _, qMax) = self.statsSum.tolist(), self.statsMax.tolist()
+        stats = {"updates": self.statsCount, "loss": lossSum / self.statsCount, "lossMax": lossMax,
+                 "qMean": qMeanSum / self.statsCount, "qMax": qMax}
+        self.statsCount = 0
+        return stats
+
+    @torch.no_grad()
     def updateTargetModel(self):
-        """Sync target model with the main model."""
-        self.targetModel.load_state_dict(self.model.state_dict())
+        """Sync target model with the main model (in-place copy, no state dict round trip)."""
+        for target, source in zip(self.targetModel.parameters(), self.model.parameters()):
+            target.copy_(source)
+
+    @torch.no_grad()
+    def softUpdateTargetModel(self, tau):
+        """Polyak update: target <- (1 - tau) * target + tau * model."""
+        for target, source in zip(self.targetModel.parameters(), self.model.parameters()):
+            target.lerp_(source, tau)
 
     def save(self, path):
         """Save the model weights."""
@@ -83,5 +189,47 @@ class DQNAgent:
 
     def load(self, path):
         """Load model weights from a file."""
-        self.model.load_state_dict(torch.load(path))
-        self.targetModel.load_state_dict(self.model.state_dict())
\ No newline at end of file
+        self.model.load_state_dict(torch.load(path, map_location=self.device))
+        self.targetModel.load_state_dict(self.model.state_dict())
+
+    def checkpointState(self, **extra):
+        """Everything needed to resume training exactly, as a snapshot detached from live objects.
+
+        Extra keyword arguments (e.g. episode, totalSteps) are stored alongside.
+        """
+        def cpuCopy(stateDict):
+            return {k: v.detach().to("cpu", copy=True) for k, v in stateDict.items()}
+
+        return {
+            "model": cpuCopy(self.model.state_dict()),
+            "targetModel": cpuCopy(self.targetModel.state_dict()),
+            "optimizer": copy.deepcopy(self.optimizer.state_dict()),
+            "epsilon": self.epsilon,
+            "stepCounter": self.stepCounter,
+            "replayBuffer": self.replayBuffer.state_dict(),
+            "rng": {
+                "agent": self.rng.getstate(),
+                "agentNumpy": self.npRng.bit_generator.state,
+                "python": random.getstate(),
+                "numpy": np.random.get_state(),
+                "torch": torch.get_rng_state(),
+            },
+            "extra": extra,
+        }
+
+    def loadCheckpoint(self, path):
+        """Restore a checkpoint written from checkpointState; returns its extra fields."""
+        # Our own file, so a full (non weights-only) unpickle is fine: it holds NumPy arrays and RNG state
+        state = torch.load(path, map_location=self.device, weights_only=False)
+        self.model.load_state_dict(state["model"])
+        self.targetModel.load_state_dict(state["targetModel"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        self.epsilon = state["epsilon"]
+        self.stepCounter = state["stepCounter"]
+        self.replayBuffer.load_state_dict(state["replayBuffer"])
+        self.rng.setstate(state["rng"]["agent"])
+        self.npRng.bit_generator.state = state["rng"]["agentNumpy"]
+        random.setstate(state["rng"]["python"])
+        np.random.set_state(state["rng"]["numpy"])
+        torch.set_rng_state(state["rng"]["torch"].cpu())
+        return state["extra"]
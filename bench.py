@@ -0,0 +1,310 @@
+# bench.py
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import torch
+from environment import PongEnv, VectorPongEnv
+from agent import DQNAgent
+from model import ReplayBuffer, MemmapReplayBuffer
+from inference import NumpyPolicy
+
+BENCHMARKS = []
+
+
+def benchmark(name, unit, higherIsBetter=True):
+    """Register a benchmark function returning one number in the given unit."""
+    def register(fn):
+        BENCHMARKS.append((name, unit, higherIsBetter, fn))
+        return fn
+    return register
+
+
+def seedEverything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def bestOf(fn, repeats):
+    """Run fn repeats times and keep the fastest wall time (least disturbed by noise)."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Config:
+    def __init__(self, quick=False, repeats=3, seed=0):
+        self.quick = quick
+        self.repeats = repeats
+        self.seed = seed
+        self.scale = 0.1 if quick else 1.0
+
+    def n(self, count):
+        return max(1, int(count * self.scale))
+
+
+@benchmark("env.step", "steps/s")
+def benchEnvStep(cfg):
+    env = PongEnv(headless=True, seed=cfg.seed)
+    steps = cfg.n(100_000)
+    actions = np.random.randint(3, size=(steps, 2)).tolist()
+
+    def run():
+        for playerAction, opponentAction in actions:
+            if env.step(playerAction, opponentAction)[4]:
+                env.reset()
+    return steps / bestOf(run, cfg.repeats)
+
+
+@benchmark("vectorEnv.step[256]", "steps/s")
+def benchVectorEnvStep(cfg):
+    env = VectorPongEnv(256, seed=cfg.seed)
+    ticks = cfg.n(5_000)
+    actions = np.random.randint(3, size=(ticks, 2, 256))
+
+    def run():
+        for playerActions, opponentActions in actions:
+            env.step(playerActions, opponentActions)
+    return ticks * 256 / bestOf(run, cfg.repeats)
+
+
+@benchmark("env.getState", "us/call", higherIsBetter=False)
+def benchGetState(cfg):
+    env = PongEnv(headless=True, seed=cfg.seed)
+    calls = cfg.n(200_000)
+
+    def run():
+        for _ in range(calls):
+            env.getState(perspective='player')
+    return bestOf(run, cfg.repeats) / calls * 1e6
+
+
+def benchReplay(cfg, capacity, makeBuffer=ReplayBuffer):
+    buffer = makeBuffer(capacity, 5, seed=cfg.seed)
+    # Fill completely so sampling touches the whole capacity
+    chunk = 100_000
+    for start in range(0, capacity, chunk):
+        count = min(chunk, capacity - start)
+        buffer.push_batch(np.random.random((count, 5)), np.random.randint(3, size=count),
+                          np.zeros(count), np.random.random((count, 5)), np.zeros(count))
+    state = np.random.random(5)
+    pushes = cfg.n(50_000)
+    samples = cfg.n(5_000)
+
+    def push():
+        for _ in range(pushes):
+            buffer.push(state, 1, 0.0, state, False)
+
+    def sample():
+        for _ in range(samples):
+            buffer.sample(64)
+    return bestOf(push, cfg.repeats) / pushes * 1e6, bestOf(sample, cfg.repeats) / samples * 1e6
+
+
+def benchMemmapReplay(cfg, capacity):
+    directory = tempfile.mkdtemp(prefix="pong_replay_")
+    try:
+        return benchReplay(cfg, capacity, lambda capacity, stateDim, seed: MemmapReplayBuffer(capacity, stateDim, directory, seed=seed))
+    finally:
+        shutil.rmtree(directory)
+
+
+def registerReplay(capacity, label="", measureFn=benchReplay):
+    cache = {}
+
+    def measure(cfg):
+        # Filling a large buffer is slow, so push and sample share one run
+        if "result" not in cache:
+            cache["result"] = measureFn(cfg, capacity)
+        return cache["result"]
+
+    benchmark(f"replay.push[{capacity}{label}]", "us/call", higherIsBetter=False)(lambda cfg: measure(cfg)[0])
+    benchmark(f"replay.sample64[{capacity}{label}]", "us/call", higherIsBetter=False)(lambda cfg: measure(cfg)[1])
+
+
+for capacity in (10_000, 100_000, 1_000_000):
+    registerReplay(capacity)
+registerReplay(1_000_000, ",memmap", benchMemmapReplay)
+
+
+def filledAgent(capacity=20_000, **agentArgs):
+    agent = DQNAgent(stateDim=5, actionDim=3, bufferSize=capacity, **agentArgs)
+    agent.epsilon = agent.epsilonMin = 0.0
+    agent.replayBuffer.push_batch(np.random.random((capacity, 5)), np.random.randint(3, size=capacity),
+                                  np.random.choice((-1.0, 0.0, 1.0), size=capacity),
+                                  np.random.random((capacity, 5)), np.random.random(capacity) < 0.01)
+    return agent
+
+
+def registerTrain(batchSize, label="", **agentArgs):
+    def benchTrain(cfg):
+        agent = filledAgent(seed=cfg.seed, **agentArgs)
+        updates = cfg.n(500)
+        for _ in range(3):
+            agent.train(batchSize)  # Warm-up (allocator, autograd graph, torch.compile)
+
+        def run():
+            for _ in range(updates):
+                agent.train(batchSize)
+        return updates / bestOf(run, cfg.repeats)
+
+    benchmark(f"agent.train[{batchSize}{label}]", "updates/s")(benchTrain)
+
+
+for batchSize in (32, 64, 256):
+    registerTrain(batchSize)
+registerTrain(64, ",soft", tau=0.005)
+registerTrain(64, ",compiled", compile=True)
+
+
+def actLatency(cfg, act):
+    states = np.random.random((1000, 5))
+    calls = cfg.n(20_000)
+
+    def run():
+        for i in range(calls):
+            act(states[i % 1000])
+    return bestOf(run, cfg.repeats) / calls * 1e6
+
+
+@benchmark("agent.act", "us/call", higherIsBetter=False)
+def benchAct(cfg):
+    agent = filledAgent(1000, seed=cfg.seed)
+    return actLatency(cfg, agent.act)
+
+
+@benchmark("agent.actBatch[2]", "us/call", higherIsBetter=False)
+def benchActBatch(cfg):
+    agent = filledAgent(1000, seed=cfg.seed)
+    pairs = np.random.random((1000, 2, 5))
+    calls = cfg.n(20_000)
+
+    def run():
+        for i in range(calls):
+            agent.actBatch(pairs[i % 1000])
+    return bestOf(run, cfg.repeats) / calls * 1e6
+
+
+@benchmark("numpyPolicy.act", "us/call", higherIsBetter=False)
+def benchNumpyPolicy(cfg):
+    agent = filledAgent(1000, seed=cfg.seed)
+    return actLatency(cfg, NumpyPolicy.fromStateDict(agent.model.state_dict()).act)
+
+
+def playEpisodes(cfg, render):
+    """Self-play episodes with greedy action selection and replay pushes, no learning."""
+    env = PongEnv(headless=True, seed=cfg.seed)
+    agent = filledAgent(1000, seed=cfg.seed)
+    episodes = max(1, cfg.n(5 if render else 20))
+
+    def run():
+        for episode in range(episodes):
+            env.reset()
+            playerState = env.getState(perspective='player')
+            opponentState = env.getState(perspective='opponent')
+            done = False
+            ticks = 0
+            while not done and ticks < 50_000:  # Guard against an endless greedy rally
+                ticks += 1
+                playerAction, opponentAction = agent.actBatch(np.stack((playerState, opponentState))).tolist()
+                playerNext, opponentNext, playerReward, opponentReward, done = env.step(playerAction, opponentAction)
+                agent.replayBuffer.push(playerState, playerAction, playerReward, playerNext, done)
+                agent.replayBuffer.push(opponentState, opponentAction, opponentReward, opponentNext, done)
+                playerState, opponentState = playerNext, opponentNext
+                if render:
+                    env.render(episode + 1)
+    elapsed = bestOf(run, 1)
+    env.close()
+    return episodes / elapsed
+
+
+@benchmark("e2e.headless", "episodes/s")
+def benchEndToEndHeadless(cfg):
+    return playEpisodes(cfg, render=False)
+
+
+@benchmark("e2e.rendered", "episodes/s")
+def benchEndToEndRendered(cfg):
+    # Without a display, render into SDL's offscreen driver so the drawing cost is still measured
+    if not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    return playEpisodes(cfg, render=True)
+
+
+def runAll(cfg, only=None):
+    results = {}
+    for name, unit, higherIsBetter, fn in BENCHMARKS:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        seedEverything(cfg.seed)
+        value = fn(cfg)
+        results[name] = {"value": value, "unit": unit, "higherIsBetter": higherIsBetter}
+        print(f"{name:<28} {value:>14.2f} {unit}", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline and return the names that regressed beyond threshold."""
+    regressions = []
+    print(f"\n{'Benchmark':<28} {'Baseline':>14} {'Current':>14} {'Change':>9}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<28} {'-':>14} {current['value']:>14.2f} {'new':>9}")
+            continue
+        change = (current["value"] - previous["value"]) / previous["value"]
+        # Positive "gain" is always an improvement, whatever the unit
+        gain = change if current["higherIsBetter"] else -change
+        flag = ""
+        if gain < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<28} {previous['value']:>14.2f} {current['value']:>14.2f} {100 * change:>+8.1f}%{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seeded benchmarks for the environment, replay, learner and inference hot paths")
+    parser.add_argument("--quick", action="store_true", help="10x fewer iterations for a fast sanity run")
+    parser.add_argument("--repeats", type=int, default=3, help="timed repeats per benchmark (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results file to compare against, e.g. bench_baseline.json")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)  # Stable numbers across machines with different core counts
+    cfg = Config(quick=args.quick, repeats=args.repeats, seed=args.seed)
+    results = runAll(cfg, args.only)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "meta": {
+                    "python": platform.python_version(),
+                    "torch": torch.__version__,
+                    "numpy": np.__version__,
+                    "machine": platform.machine(),
+                    "processor": platform.processor(),
+                    "quick": args.quick,
+                    "seed": args.seed,
+                },
+                "results": results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,81 @@
+# checkpoint.py
+import os
+import re
+import queue
+import threading
+import torch
+
+
+class CheckpointWriter:
+    def __init__(self, directory, prefix="checkpoint", keepLast=3, suffix=".pt"):
+        """Write training checkpoints on a background thread, keeping only the newest keepLast files.
+
+        Files are named <prefix>_<index><suffix>.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.suffix = suffix
+        self.keepLast = keepLast
+        self.pattern = re.compile(rf"^{re.escape(prefix)}_(\d+){re.escape(suffix)}$")
+        os.makedirs(directory, exist_ok=True)
+        # Bounded so a slow disk applies back-pressure instead of piling up snapshots in RAM
+        self.pending = queue.Queue(maxsize=2)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="CheckpointWriter", daemon=True)
+        self.thread.start()
+
+    def save(self, state, index):
+        """Queue a snapshot (e.g. from DQNAgent.checkpointState) to be written as <prefix>_<index><suffix>."""
+        if self.error is not None:
+            raise RuntimeError("Checkpoint writer failed") from self.error
+        self.pending.put((state, self.pathFor(index)))
+
+    def pathFor(self, index):
+        return os.path.join(self.directory, f"{self.prefix}_{index}{self.suffix}")
+
+    def checkpoints(self):
+        """Existing checkpoint paths, oldest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            match = self.pattern.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return [path for _, path in sorted(found)]
+
+    def latest(self):
+        """Path of the newest checkpoint on disk, or None."""
+        existing = self.checkpoints()
+        return existing[-1] if existing else None
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            try:
+                if item is None:
+                    return
+                state, path = item
+                # Write to a temp file and rename so a crash never leaves a truncated checkpoint
+                tmpPath = path + ".tmp"
+                torch.save(state, tmpPath)
+                os.replace(tmpPath, path)
+                self._prune()
+            except Exception as e:
+                self.error = e
+            finally:
+                self.pending.task_done()
+
+    def _prune(self):
+        existing = self.checkpoints()
+        for path in existing[:max(0, len(existing) - self.keepLast)]:
+            os.remove(path)
+
+    def flush(self):
+        """Block until every queued checkpoint is on disk."""
+        self.pending.join()
+        if self.error is not None:
+            raise RuntimeError("Checkpoint writer failed") from self.error
+
+    def close(self):
+        self.flush()
+        self.pending.put(None)
+        self.thread.join()
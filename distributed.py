@@ -0,0 +1,180 @@
+# distributed.py
+import argparse
+import queue
+import time
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from environment import PongEnv
+from agent import DQNAgent
+from model import DQN
+
+
+def actorEpsilon(actorId, numActors, base=0.4, alpha=7):
+    """Fixed per-actor exploration rate (Ape-X style): actor 0 explores most, the last actor least."""
+    if numActors == 1:
+        return base
+    return base ** (1 + alpha * actorId / (numActors - 1))
+
+
+def runActor(actorId, numActors, sharedModel, transitionQueue, statsQueue, stopEvent,
+             stateDim, actionDim, syncEvery, chunkSize, statsEvery):
+    """Play self-play games with a local copy of the shared weights and ship transitions in chunks."""
+    torch.set_num_threads(1)  # One core per actor; the learner keeps the rest
+    np.random.seed(actorId)
+    env = PongEnv(headless=True)
+    model = DQN(stateDim, actionDim)
+    model.load_state_dict(sharedModel.state_dict())
+    epsilon = actorEpsilon(actorId, numActors)
+
+    # Each tick yields two transitions (player and mirrored opponent)
+    states = np.zeros((chunkSize, stateDim), dtype=np.float32)
+    actions = np.zeros(chunkSize, dtype=np.int64)
+    rewards = np.zeros(chunkSize, dtype=np.float32)
+    nextStates = np.zeros((chunkSize, stateDim), dtype=np.float32)
+    dones = np.zeros(chunkSize, dtype=np.float32)
+    filled = 0
+
+    playerState = env.getState(perspective='player')
+    opponentState = env.getState(perspective='opponent')
+    steps = 0
+    reportSteps = 0
+    reportStart = time.perf_counter()
+
+    while not stopEvent.is_set():
+        if steps % syncEvery == 0:
+            model.load_state_dict(sharedModel.state_dict())
+
+        pair = np.stack((playerState, opponentState))
+        explore = np.random.random(2) < epsilon
+        pairActions = np.random.randint(actionDim, size=2)
+        if not explore.all():
+            with torch.inference_mode():
+                greedy = model(torch.from_numpy(pair.astype(np.float32))).argmax(dim=1).numpy()
+            pairActions = np.where(explore, pairActions, greedy)
+        playerAction, opponentAction = pairActions.tolist()
+
+        playerNextState, opponentNextState, playerReward, opponentReward, done = env.step(playerAction, opponentAction)
+        for state, action, reward, nextState in ((playerState, playerAction, playerReward, playerNextState),
+                                                 (opponentState, opponentAction, opponentReward, opponentNextState)):
+            states[filled] = state
+            actions[filled] = action
+            rewards[filled] = reward
+            nextStates[filled] = nextState
+            dones[filled] = done
+            filled += 1
+        if filled >= chunkSize - 1:
+            transitionQueue.put((states[:filled].copy(), actions[:filled].copy(), rewards[:filled].copy(),
+                                 nextStates[:filled].copy(), dones[:filled].copy()))
+            filled = 0
+
+        if done:
+            env.reset()
+            playerState = env.getState(perspective='player')
+            opponentState = env.getState(perspective='opponent')
+        else:
+            playerState = playerNextState
+            opponentState = opponentNextState
+        steps += 1
+        reportSteps += 1
+
+        elapsed = time.perf_counter() - reportStart
+        if elapsed >= statsEvery:
+            statsQueue.put((actorId, reportSteps / elapsed))
+            reportSteps = 0
+            reportStart = time.perf_counter()
+
+
+def trainDistributed(numActors=4, totalSteps=1_000_000, batchSize=64, updatesPerStep=0.25,
+                     publishEvery=100, syncEvery=400, chunkSize=512, statsEvery=5.0,
+                     bufferSize=1_000_000, savePath=None, stateDim=5, actionDim=3):
+    """Run numActors worker processes feeding a single learner in this process.
+
+    Actors pull fresh weights from a shared-memory DQN every syncEvery env steps; the
+    learner publishes its weights there every publishEvery gradient updates and does
+    updatesPerStep gradient updates per transition received.
+    """
+    ctx = mp.get_context("spawn")
+    learner = DQNAgent(stateDim, actionDim, bufferSize=bufferSize)
+    sharedModel = DQN(stateDim, actionDim)
+    sharedModel.load_state_dict(learner.model.state_dict())
+    sharedModel.share_memory()
+
+    transitionQueue = ctx.Queue(maxsize=numActors * 8)
+    statsQueue = ctx.Queue()
+    stopEvent = ctx.Event()
+    actors = [ctx.Process(target=runActor, daemon=True,
+                          args=(i, numActors, sharedModel, transitionQueue, statsQueue, stopEvent,
+                                stateDim, actionDim, syncEvery, chunkSize, statsEvery))
+              for i in range(numActors)]
+    for actor in actors:
+        actor.start()
+
+    actorRates = {}
+    received = 0
+    updates = 0
+    pendingUpdates = 0.0
+    start = time.perf_counter()
+    lastReport = start
+    try:
+        while received < totalSteps:
+            try:
+                chunk = transitionQueue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            learner.replayBuffer.push_batch(*chunk)
+            received += len(chunk[1])
+
+            pendingUpdates += len(chunk[1]) * updatesPerStep
+            while pendingUpdates >= 1:
+                learner.train(batchSize)
+                pendingUpdates -= 1
+                updates += 1
+                if updates % publishEvery == 0:
+                    with torch.no_grad():
+                        for shared, live in zip(sharedModel.parameters(), learner.model.parameters()):
+                            shared.copy_(live)
+
+            while True:
+                try:
+                    actorId, rate = statsQueue.get_nowait()
+                except queue.Empty:
+                    break
+                actorRates[actorId] = rate
+
+            now = time.perf_counter()
+            if now - lastReport >= statsEvery:
+                perActor = ", ".join(f"actor {i}: {actorRates[i]:.0f}" for i in sorted(actorRates))
+                print(f"Transitions: {received}, Updates: {updates}, "
+                      f"Learner: {received / (now - start):.0f} transitions/s, {updates / (now - start):.0f} updates/s | "
+                      f"Env steps/s per actor: {perActor} (total {sum(actorRates.values()):.0f})")
+                lastReport = now
+    finally:
+        stopEvent.set()
+        # Drain so actors blocked on a full queue can see the stop flag and exit
+        deadline = time.perf_counter() + 5.0
+        while any(actor.is_alive() for actor in actors) and time.perf_counter() < deadline:
+            try:
+                transitionQueue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for actor in actors:
+            actor.join(timeout=1.0)
+            if actor.is_alive():
+                actor.terminate()
+
+    if savePath:
+        learner.save(savePath)
+    return learner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Actor/learner self-play training")
+    parser.add_argument("--actors", type=int, default=max(1, mp.cpu_count() - 1))
+    parser.add_argument("--steps", type=int, default=1_000_000, help="transitions to collect")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--updates-per-step", type=float, default=0.25)
+    parser.add_argument("--save", default="models/v3/pong_model_distributed_v3.pth")
+    args = parser.parse_args()
+    trainDistributed(numActors=args.actors, totalSteps=args.steps, batchSize=args.batch_size,
+                     updatesPerStep=args.updates_per_step, savePath=args.save)
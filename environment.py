@@ -1,11 +1,73 @@
 # environment.py
-import pygame
 import random
 import numpy as np
 
+pygame = None  # Imported on first render so headless runs never load SDL
+
+
+def loadPygame():
+    """Import pygame on demand and return the module."""
+    global pygame
+    if pygame is None:
+        import pygame as pg
+        pygame = pg
+    return pygame
+
+
+class Box:
+    """Axis-aligned rectangle held as plain ints, mirroring the pygame.Rect fields we use."""
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @property
+    def top(self):
+        return self.y
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    @property
+    def left(self):
+        return self.x
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def center(self):
+        return (self.x + self.width // 2, self.y + self.height // 2)
+
+    @center.setter
+    def center(self, value):
+        self.x = value[0] - self.width // 2
+        self.y = value[1] - self.height // 2
+
+    def colliderect(self, other):
+        """Same overlap test as pygame.Rect.colliderect (touching edges do not collide)."""
+        return (self.width > 0 and self.height > 0 and other.width > 0 and other.height > 0
+                and self.x < other.x + other.width and other.x < self.x + self.width
+                and self.y < other.y + other.height and other.y < self.y + self.height)
+
+    def asTuple(self):
+        return (self.x, self.y, self.width, self.height)
+
+
 class PongEnv:
-    def __init__(self):
-        pygame.init()
+    def __init__(self, headless=False, frameSkip=1, seed=None, interceptFeature=False):
+        """Create the game. With headless=True no window is opened until render is called.
+
+        frameSkip is the default number of physics ticks each step() repeats its actions for.
+        seed fixes this environment's own RNG stream (serve directions), independent of the
+        global random module. interceptFeature appends the predicted intercept height
+        (see predictIntercept) to getState, making it 6 features instead of 5.
+        """
         self.WIDTH, self.HEIGHT = 800, 600
         self.PADDLEWIDTH, self.PADDLEHEIGHT = 15, 90
         self.BALLSIZE = 15
@@ -14,24 +76,63 @@ class PongEnv:
         self.WHITE = (255, 255, 255)
         self.BLACK = (0, 0, 0)
         self.RED = (255, 0, 0)
+        self.frameSkip = frameSkip
+        self.rng = random.Random(seed)
+        self.interceptFeature = interceptFeature
+        self.stateDim = 6 if interceptFeature else 5
+        self.serveCount = 0  # Bumped on every serve so cached predictions never outlive a rally
+        self.interceptCache = {}  # side -> (trajectory key, predicted y)
 
-        self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
-        pygame.display.set_caption("Pong")
+        self.screen = None
+        self.font = None
+        self.renderer = None
 
         self.reset()
 
+        if not headless:
+            self.initDisplay()
+
+    def seed(self, seed):
+        """Reseed the environment's RNG; seed followed by reset() starts a reproducible episode."""
+        self.rng.seed(seed)
+
+    def snapshot(self):
+        """Integer summary of the full physics state, for exact comparisons between runs."""
+        return (self.playerScore, self.opponentScore, self.ball.x, self.ball.y,
+                self.ballSpeed[0], self.ballSpeed[1], self.player.y, self.opponent.y)
+
+    def restore(self, snapshot):
+        """Set the physics state from a snapshot() tuple (used to mirror another env, e.g. for a spectator)."""
+        (self.playerScore, self.opponentScore, self.ball.x, self.ball.y,
+         self.ballSpeed[0], self.ballSpeed[1], self.player.y, self.opponent.y) = snapshot
+
+    def initDisplay(self):
+        """Open the game window, load the score font and set up the renderer."""
+        from renderer import Renderer
+        loadPygame()
+        pygame.init()
+        self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
+        pygame.display.set_caption("Pong")
         self.font = pygame.font.Font(None, 74)
+        self.renderer = Renderer(self, self.screen)
 
     def reset(self):
         """Reset the environment: ball, paddles, and scores."""
         # Reset paddles to center
-        self.player = pygame.Rect(50, self.HEIGHT // 2 - self.PADDLEHEIGHT // 2, self.PADDLEWIDTH, self.PADDLEHEIGHT)
-        self.opponent = pygame.Rect(self.WIDTH - 50 - self.PADDLEWIDTH, self.HEIGHT // 2 - self.PADDLEHEIGHT // 2, self.PADDLEWIDTH, self.PADDLEHEIGHT)
+        self.player = Box(50, self.HEIGHT // 2 - self.PADDLEHEIGHT // 2, self.PADDLEWIDTH, self.PADDLEHEIGHT)
+        self.opponent = Box(self.WIDTH - 50 - self.PADDLEWIDTH, self.HEIGHT // 2 - self.PADDLEHEIGHT // 2, self.PADDLEWIDTH, self.PADDLEHEIGHT)
         # Reset ball
-        self.ball = pygame.Rect(self.WIDTH // 2 - self.BALLSIZE // 2, self.HEIGHT // 2 - self.BALLSIZE // 2, self.BALLSIZE, self.BALLSIZE)
+        self.ball = Box(self.WIDTH // 2 - self.BALLSIZE // 2, self.HEIGHT // 2 - self.BALLSIZE // 2, self.BALLSIZE, self.BALLSIZE)
         
         self.playerScore = 0
         self.opponentScore = 0
+        # Per-episode rally statistics (a rally is the run of paddle hits within one point)
+        self.playerHits = 0
+        self.opponentHits = 0
+        self.rallyHits = 0
+        self.longestRally = 0
+        if self.renderer is not None:
+            self.renderer.invalidate()  # Callers may have drawn over the window between episodes
         
         #self.ballSpeed = [self.BALLSPEED * random.choice((1, -1)), self.BALLSPEED * random.choice((1, -1))]
         self.resetBall()
@@ -60,10 +161,14 @@ class PongEnv:
         if self.ball.colliderect(self.player) and self.ballSpeed[0] < 0:
             self.ballSpeed[0] = -self.ballSpeed[0]
             playerHit = True
+            self.playerHits += 1
+            self.rallyHits += 1
             #print('Player hit the ball!')
         if self.ball.colliderect(self.opponent) and self.ballSpeed[0] > 0:
             self.ballSpeed[0] = -self.ballSpeed[0]
             opponentHit = True
+            self.opponentHits += 1
+            self.rallyHits += 1
             #print('Opponent hit the ball!')
 
         # Scoring and reset
@@ -79,30 +184,43 @@ class PongEnv:
         
         return playerHit, opponentHit
 
-    def step(self, player_action, opponent_action):
-        """Apply actions, update state, and return next states, rewards, and done."""
-        # Apply actions
-        if player_action == 0:
-            self.movePaddle(self.player, up=True)
-        elif player_action == 1:
-            self.movePaddle(self.player, up=False)
-        if opponent_action == 0:
-            self.movePaddle(self.opponent, up=True)
-        elif opponent_action == 1:
-            self.movePaddle(self.opponent, up=False)
-
-        # Update game state
-        prevPlayerScore = self.playerScore
-        prevOpponentScore = self.opponentScore
-        playerHit, opponentHit = self.moveBall()
-
-        # Calculate rewards
-        playerReward = 1 if self.playerScore > prevPlayerScore else -1 if self.opponentScore > prevOpponentScore else 0
-        #if playerHit:
-        #    playerReward += 0.1
-        opponentReward = -1 if self.playerScore > prevPlayerScore else 1 if self.opponentScore > prevOpponentScore else 0
-        #if opponentHit:
-        #    opponentReward += 0.1
+    def step(self, player_action, opponent_action, repeat=None):
+        """Apply actions, update state, and return next states, rewards, and done.
+
+        The actions are repeated for `repeat` physics ticks (self.frameSkip if None) and the
+        rewards summed; repetition stops early as soon as a point is scored, so one call
+        never spans two rallies.
+        """
+        repeat = repeat or self.frameSkip
+        playerReward = 0
+        opponentReward = 0
+        for _ in range(repeat):
+            # Apply actions
+            if player_action == 0:
+                self.movePaddle(self.player, up=True)
+            elif player_action == 1:
+                self.movePaddle(self.player, up=False)
+            if opponent_action == 0:
+                self.movePaddle(self.opponent, up=True)
+            elif opponent_action == 1:
+                self.movePaddle(self.opponent, up=False)
+
+            # Update game state
+            prevPlayerScore = self.playerScore
+            prevOpponentScore = self.opponentScore
+            playerHit, opponentHit = self.moveBall()
+
+            # Calculate rewards
+            playerScored = self.playerScore > prevPlayerScore
+            opponentScored = self.opponentScore > prevOpponentScore
+            playerReward += 1 if playerScored else -1 if opponentScored else 0
+            #if playerHit:
+            #    playerReward += 0.1
+            opponentReward += -1 if playerScored else 1 if opponentScored else 0
+            #if opponentHit:
+            #    opponentReward += 0.1
+            if playerScored or opponentScored:
+                break
 
         # Get next states
         playerNextState = self.getState(perspective='player')
@@ -121,18 +239,68 @@ class PongEnv:
     def resetBall(self):
         """Reset ball to center with random direction."""
         self.resetPaddles()
+        self.longestRally = max(self.longestRally, self.rallyHits)
+        self.rallyHits = 0
         self.ball.center = (self.WIDTH // 2, self.HEIGHT // 2)
         #if self.playerScore == 0 and self.opponentScore == 0:
             # Horizontal trajectory at game start
             #print("Start ball with horizontal trajectory")
         #    self.ballSpeed = [self.BALLSPEED * random.choice((1, -1)), 0]
         #else:
-        self.ballSpeed = [self.BALLSPEED * random.choice((1, -1)), self.BALLSPEED * random.choice((1, -1))]
+        self.ballSpeed = [self.BALLSPEED * self.rng.choice((1, -1)), self.BALLSPEED * self.rng.choice((1, -1))]
+        self.serveCount += 1
+
+    def predictIntercept(self, side='player'):
+        """Ball centre y when it next reaches the given paddle's column, or None if it is moving away.
+
+        Walks the trajectory one wall bounce at a time with exactly the discrete rules of
+        moveBall (move, then flip if at or past a wall), so the answer matches the simulation.
+        The result is cached until the ball's velocity changes or it is served again, making
+        repeated calls within a flight O(1).
+        """
+        key = (side, self.ballSpeed[0], self.ballSpeed[1], self.serveCount)
+        cached = self.interceptCache.get(side)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        speedX, speedY = self.ballSpeed
+        x, y = self.ball.x, self.ball.y
+        if side == 'player' and speedX < 0:
+            edge = self.player.x + self.player.width
+            ticks = (x - edge) // -speedX + 1 if x >= edge else 0
+        elif side != 'player' and speedX > 0:
+            edge = self.opponent.x
+            ticks = (edge - x - self.BALLSIZE) // speedX + 1 if x + self.BALLSIZE <= edge else 0
+        else:
+            self.interceptCache[side] = (key, None)
+            return None
+
+        bottom = self.HEIGHT - self.BALLSIZE  # Largest y before the bottom wall triggers
+        while ticks > 0 and speedY != 0:
+            # Moves until the next wall flip (at least one: the check happens after moving)
+            if speedY < 0:
+                untilWall = -(-y // -speedY) if y > 0 else 1
+            else:
+                untilWall = -(-(bottom - y) // speedY) if y < bottom else 1
+            if untilWall >= ticks:
+                y += ticks * speedY
+                break
+            y += untilWall * speedY
+            ticks -= untilWall
+            speedY = -speedY
+
+        intercept = y + self.BALLSIZE / 2
+        self.interceptCache[side] = (key, intercept)
+        return intercept
 
     def getState(self, perspective='player'):
-        """Return normalized game state for the agent."""
+        """Return normalized game state for the agent.
+
+        With interceptFeature on, a sixth value holds the predicted intercept height for this
+        perspective's paddle (0.5, the resting height, while the ball moves away).
+        """
         if perspective == 'player':
-            return np.array([
+            state = np.array([
                 self.ball.x / self.WIDTH,
                 self.ball.y / self.HEIGHT,
                 self.ballSpeed[0] / self.BALLSPEED,
@@ -141,7 +309,7 @@ class PongEnv:
                 #self.opponent.y / self.HEIGHT
             ])
         else:  # Opponent perspective (right paddle)
-            return np.array([
+            state = np.array([
                 (self.WIDTH - self.ball.x) / self.WIDTH,  # Mirrored ball x
                 self.ball.y / self.HEIGHT,                # Ball y
                 -self.ballSpeed[0] / self.BALLSPEED,    # Mirrored ball velocity x
@@ -149,23 +317,141 @@ class PongEnv:
                 self.opponent.y / self.HEIGHT,            # Opponent paddle y
                 #self.player.y / self.HEIGHT               # Player paddle y
             ])
+        if self.interceptFeature:
+            intercept = self.predictIntercept(perspective)
+            state = np.append(state, 0.5 if intercept is None else intercept / self.HEIGHT)
+        return state
 
 
     def render(self, episode):
-        """Draw the game elements on the screen."""
-        self.screen.fill(self.BLACK)
-        pygame.draw.rect(self.screen, self.WHITE, self.player)
-        pygame.draw.rect(self.screen, self.WHITE, self.opponent)
-        pygame.draw.ellipse(self.screen, self.WHITE, self.ball)
-        pygame.draw.aaline(self.screen, self.WHITE, (self.WIDTH // 2, 0), (self.WIDTH // 2, self.HEIGHT))
-        playerText = self.font.render(str(self.playerScore), False, self.WHITE)
-        opponentText = self.font.render(str(self.opponentScore), False, self.WHITE)
-        episodeText = self.font.render(f"Episode: {episode}", True, self.RED)
-        self.screen.blit(playerText, (self.WIDTH // 4, 20))
-        self.screen.blit(episodeText, (300, 550))
-        self.screen.blit(opponentText, (3 * self.WIDTH // 4, 20))
-        pygame.display.flip()
+        """Draw the game elements on the screen (only the regions that changed, see renderer.Renderer)."""
+        if self.screen is None:
+            self.initDisplay()
+        self.renderer.draw(episode)
 
     def close(self):
         """Clean up and close the game."""
-        pygame.quit()
\ No newline at end of file
+        if pygame is not None:
+            pygame.quit()
+
+class VectorPongEnv:
+    def __init__(self, numEnvs, seed=None):
+        """Run numEnvs independent headless games with their state held in NumPy arrays."""
+        self.numEnvs = numEnvs
+        self.WIDTH, self.HEIGHT = 800, 600
+        self.PADDLEWIDTH, self.PADDLEHEIGHT = 15, 90
+        self.BALLSIZE = 15
+        self.PADDLESPEED = 7
+        self.BALLSPEED = 7
+        self.WINSCORE = 10
+        self.playerX = 50
+        self.opponentX = self.WIDTH - 50 - self.PADDLEWIDTH
+        self.rng = np.random.default_rng(seed)
+
+        self.ballX = np.zeros(numEnvs, dtype=np.int64)
+        self.ballY = np.zeros(numEnvs, dtype=np.int64)
+        self.ballSpeedX = np.zeros(numEnvs, dtype=np.int64)
+        self.ballSpeedY = np.zeros(numEnvs, dtype=np.int64)
+        self.playerY = np.zeros(numEnvs, dtype=np.int64)
+        self.opponentY = np.zeros(numEnvs, dtype=np.int64)
+        self.playerScore = np.zeros(numEnvs, dtype=np.int64)
+        self.opponentScore = np.zeros(numEnvs, dtype=np.int64)
+        # Scores of the most recently finished game in each slot, kept across the auto-reset
+        self.finalPlayerScore = np.zeros(numEnvs, dtype=np.int64)
+        self.finalOpponentScore = np.zeros(numEnvs, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """Reset the games selected by a boolean mask (all games if mask is None)."""
+        if mask is None:
+            mask = np.ones(self.numEnvs, dtype=bool)
+        self.playerScore[mask] = 0
+        self.opponentScore[mask] = 0
+        self.resetBall(mask)
+
+    def resetBall(self, mask):
+        """Recenter ball and paddles and pick a random diagonal direction for the masked games."""
+        count = int(mask.sum())
+        if count == 0:
+            return
+        self.playerY[mask] = self.HEIGHT // 2 - self.PADDLEHEIGHT // 2
+        self.opponentY[mask] = self.HEIGHT // 2 - self.PADDLEHEIGHT // 2
+        self.ballX[mask] = self.WIDTH // 2 - self.BALLSIZE // 2
+        self.ballY[mask] = self.HEIGHT // 2 - self.BALLSIZE // 2
+        signs = self.rng.choice((1, -1), size=(2, count))
+        self.ballSpeedX[mask] = self.BALLSPEED * signs[0]
+        self.ballSpeedY[mask] = self.BALLSPEED * signs[1]
+
+    def movePaddles(self, paddleY, actions):
+        """Move paddles up (0) or down (1) within screen bounds, in place."""
+        paddleY -= self.PADDLESPEED * ((actions == 0) & (paddleY > 0))
+        paddleY += self.PADDLESPEED * ((actions == 1) & (paddleY + self.PADDLEHEIGHT < self.HEIGHT))
+
+    def collides(self, paddleX, paddleY):
+        """Overlap test between every ball and the given paddles, matching Rect.colliderect."""
+        return ((self.ballX < paddleX + self.PADDLEWIDTH) & (paddleX < self.ballX + self.BALLSIZE)
+                & (self.ballY < paddleY + self.PADDLEHEIGHT) & (paddleY < self.ballY + self.BALLSIZE))
+
+    def moveBall(self):
+        """Advance every ball one tick; same rules as PongEnv.moveBall. Returns scoring and hit masks."""
+        self.ballX += self.ballSpeedX
+        self.ballY += self.ballSpeedY
+
+        # Bounce off top/bottom walls
+        wall = (self.ballY <= 0) | (self.ballY + self.BALLSIZE >= self.HEIGHT)
+        self.ballSpeedY[wall] *= -1
+
+        # Paddle collisions, checked in the same order as the single-game env
+        playerHit = self.collides(self.playerX, self.playerY) & (self.ballSpeedX < 0)
+        self.ballSpeedX[playerHit] *= -1
+        opponentHit = self.collides(self.opponentX, self.opponentY) & (self.ballSpeedX > 0)
+        self.ballSpeedX[opponentHit] *= -1
+
+        # Scoring and reset
+        opponentScored = self.ballX <= 0
+        self.opponentScore += opponentScored
+        self.resetBall(opponentScored)
+        playerScored = self.ballX + self.BALLSIZE >= self.WIDTH
+        self.playerScore += playerScored
+        self.resetBall(playerScored)
+
+        return playerScored, opponentScored, playerHit, opponentHit
+
+    def step(self, playerActions, opponentActions):
+        """Apply one action per game and advance all games by one tick.
+
+        Returns (playerStates, opponentStates, playerRewards, opponentRewards, dones).
+        Finished games are reset before returning, so their rows in the state arrays
+        already hold the first state of the next game; their final scores are kept in
+        finalPlayerScore / finalOpponentScore.
+        """
+        self.movePaddles(self.playerY, np.asarray(playerActions))
+        self.movePaddles(self.opponentY, np.asarray(opponentActions))
+
+        playerScored, opponentScored, _, _ = self.moveBall()
+        playerRewards = playerScored.astype(np.float32) - opponentScored.astype(np.float32)
+        opponentRewards = -playerRewards
+
+        dones = (self.playerScore >= self.WINSCORE) | (self.opponentScore >= self.WINSCORE)
+        if dones.any():
+            self.finalPlayerScore[dones] = self.playerScore[dones]
+            self.finalOpponentScore[dones] = self.opponentScore[dones]
+            self.reset(dones)
+
+        return self.getState('player'), self.getState('opponent'), playerRewards, opponentRewards, dones
+
+    def getState(self, perspective='player'):
+        """Return an (numEnvs, 5) array of normalized states in the PongEnv.getState layout."""
+        states = np.empty((self.numEnvs, 5), dtype=np.float32)
+        if perspective == 'player':
+            states[:, 0] = self.ballX / self.WIDTH
+            states[:, 2] = self.ballSpeedX / self.BALLSPEED
+            states[:, 4] = self.playerY / self.HEIGHT
+        else:  # Opponent perspective (right paddle), mirrored horizontally
+            states[:, 0] = (self.WIDTH - self.ballX) / self.WIDTH
+            states[:, 2] = -self.ballSpeedX / self.BALLSPEED
+            states[:, 4] = self.opponentY / self.HEIGHT
+        states[:, 1] = self.ballY / self.HEIGHT
+        states[:, 3] = self.ballSpeedY / self.BALLSPEED
+        return states
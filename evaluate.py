@@ -0,0 +1,161 @@
+# evaluate.py
+import argparse
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import numpy as np
+import torch
+from environment import VectorPongEnv
+from model import DQN
+
+
+def loadPolicy(path, stateDim=5, actionDim=3):
+    """Load a .pth state dict into a CPU DQN for greedy play."""
+    model = DQN(stateDim, actionDim)
+    model.load_state_dict(torch.load(path, map_location="cpu"))
+    model.eval()
+    return model
+
+
+def greedyActions(model, states):
+    if len(states) == 0:
+        return np.zeros(0, dtype=np.int64)
+    with torch.inference_mode():
+        return model(torch.from_numpy(states)).argmax(dim=1).numpy()
+
+
+def playMatch(pathA, pathB, numGames=200, seed=0, maxTicks=50000):
+    """Play numGames headless games of A vs B in one VectorPongEnv, swapping sides for half of them.
+
+    Returns per-match totals from A's point of view. Games still running after maxTicks
+    are scored by their current points (a tie counts as a draw).
+    """
+    modelA, modelB = loadPolicy(pathA), loadPolicy(pathB)
+    env = VectorPongEnv(numGames, seed=seed)
+    aIsPlayer = np.arange(numGames) < numGames // 2  # A on the left paddle in the first half
+    active = np.ones(numGames, dtype=bool)
+    scoreA = np.zeros(numGames, dtype=np.int64)
+    scoreB = np.zeros(numGames, dtype=np.int64)
+
+    playerStates, opponentStates = env.getState('player'), env.getState('opponent')
+    for _ in range(maxTicks):
+        # One forward pass per model: each sees its own paddle's perspective in every game
+        aActions = greedyActions(modelA, np.where(aIsPlayer[:, None], playerStates, opponentStates))
+        bActions = greedyActions(modelB, np.where(aIsPlayer[:, None], opponentStates, playerStates))
+        playerActions = np.where(aIsPlayer, aActions, bActions)
+        opponentActions = np.where(aIsPlayer, bActions, aActions)
+        playerStates, opponentStates, _, _, dones = env.step(playerActions, opponentActions)
+
+        finished = dones & active
+        if finished.any():
+            scoreA[finished] = np.where(aIsPlayer, env.finalPlayerScore, env.finalOpponentScore)[finished]
+            scoreB[finished] = np.where(aIsPlayer, env.finalOpponentScore, env.finalPlayerScore)[finished]
+            active &= ~dones
+            if not active.any():
+                break
+
+    if active.any():
+        scoreA[active] = np.where(aIsPlayer, env.playerScore, env.opponentScore)[active]
+        scoreB[active] = np.where(aIsPlayer, env.opponentScore, env.playerScore)[active]
+
+    return {
+        "a": pathA,
+        "b": pathB,
+        "games": numGames,
+        "winsA": int((scoreA > scoreB).sum()),
+        "winsB": int((scoreB > scoreA).sum()),
+        "draws": int((scoreA == scoreB).sum()),
+        "pointsA": int(scoreA.sum()),
+        "pointsB": int(scoreB.sum()),
+        "unfinished": int(active.sum()),
+    }
+
+
+def _playMatch(args):
+    return playMatch(*args)
+
+
+def _initWorker():
+    torch.set_num_threads(1)
+
+
+def eloRatings(results, players, iterations=200, base=1500):
+    """Elo-style ratings from a Bradley-Terry fit of all match results (draws count as half a win)."""
+    wins = {(r["a"], r["b"]): r["winsA"] + 0.5 * r["draws"] for r in results}
+    wins.update({(r["b"], r["a"]): r["winsB"] + 0.5 * r["draws"] for r in results})
+    games = {}
+    for r in results:
+        games[(r["a"], r["b"])] = games[(r["b"], r["a"])] = r["games"]
+
+    # Minorization-maximization updates; a small prior keeps undefeated players finite
+    strength = {p: 1.0 for p in players}
+    for _ in range(iterations):
+        updated = {}
+        for p in players:
+            totalWins = 0.5 + sum(w for (i, _), w in wins.items() if i == p)
+            denom = 1.0 / (1.0 + strength[p]) + sum(n / (strength[p] + strength[j]) for (i, j), n in games.items() if i == p)
+            updated[p] = totalWins / denom
+        meanLog = sum(math.log(s) for s in updated.values()) / len(updated)
+        strength = {p: s / math.exp(meanLog) for p, s in updated.items()}
+    return {p: base + 400 * math.log10(strength[p]) for p in players}
+
+
+def tournament(paths, numGames=200, workers=None, seed=0, maxTicks=50000):
+    """Round-robin every pair of checkpoints, running matches in parallel worker processes."""
+    pairs = [(a, b, numGames, seed + i, maxTicks) for i, (a, b) in enumerate(itertools.combinations(paths, 2))]
+    workers = workers or min(len(pairs), os.cpu_count() or 1)
+    if workers <= 1:
+        results = [_playMatch(pair) for pair in pairs]
+    else:
+        with mp.get_context("spawn").Pool(workers, initializer=_initWorker) as pool:
+            results = pool.map(_playMatch, pairs)
+
+    table = {p: {"games": 0, "wins": 0, "losses": 0, "draws": 0, "pointsFor": 0, "pointsAgainst": 0} for p in paths}
+    for r in results:
+        for me, them, won, lost, pf, pa in ((r["a"], r["b"], r["winsA"], r["winsB"], r["pointsA"], r["pointsB"]),
+                                            (r["b"], r["a"], r["winsB"], r["winsA"], r["pointsB"], r["pointsA"])):
+            row = table[me]
+            row["games"] += r["games"]
+            row["wins"] += won
+            row["losses"] += lost
+            row["draws"] += r["draws"]
+            row["pointsFor"] += pf
+            row["pointsAgainst"] += pa
+    ratings = eloRatings(results, paths)
+    for p, row in table.items():
+        row["winRate"] = row["wins"] / row["games"] if row["games"] else 0.0
+        row["pointDiff"] = row["pointsFor"] - row["pointsAgainst"]
+        row["elo"] = ratings[p]
+    return results, table
+
+
+def printTable(results, table):
+    for r in results:
+        print(f"{os.path.basename(r['a'])} vs {os.path.basename(r['b'])}: "
+              f"{r['winsA']}-{r['winsB']} ({r['draws']} draws), points {r['pointsA']}-{r['pointsB']}")
+    print()
+    print(f"{'Model':<40}{'Elo':>8}{'Win %':>8}{'W':>6}{'L':>6}{'D':>6}{'+/-':>8}")
+    for p, row in sorted(table.items(), key=lambda item: -item[1]["elo"]):
+        print(f"{os.path.basename(p):<40}{row['elo']:>8.0f}{100 * row['winRate']:>8.1f}"
+              f"{row['wins']:>6}{row['losses']:>6}{row['draws']:>6}{row['pointDiff']:>+8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless round-robin tournament between DQN checkpoints")
+    parser.add_argument("models", nargs="+", help=".pth state dicts to compare")
+    parser.add_argument("--games", type=int, default=200, help="games per pairing")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=50000)
+    parser.add_argument("--json", help="also write results and table to this file")
+    args = parser.parse_args()
+    if len(args.models) < 2:
+        parser.error("need at least two models")
+
+    results, table = tournament(args.models, args.games, args.workers, args.seed, args.max_ticks)
+    printTable(results, table)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"matches": results, "table": table}, f, indent=2)
@@ -0,0 +1,139 @@
+# inference.py
+import argparse
+import time
+import numpy as np
+import torch
+
+
+class NumpyPolicy:
+    def __init__(self, layers):
+        """Greedy DQN policy evaluated with plain NumPy matmuls.
+
+        layers is a list of (weight, bias) pairs with weights stored transposed, i.e.
+        shaped (inputs, outputs), so a forward pass is x @ W + b with ReLU in between.
+        """
+        self.layers = [(np.ascontiguousarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32)) for w, b in layers]
+
+        # Single-state path: each bias is folded into its weight matrix as an extra input row
+        # fed by a constant 1, and every hidden layer carries that 1 forward as an extra unit
+        # (ReLU(1) == 1), so act() is one dot and one in-place ReLU per layer.
+        self.hidden = []
+        for w, b in self.layers[:-1]:
+            fused = np.zeros((w.shape[0] + 1, w.shape[1] + 1), dtype=np.float32)
+            fused[:-1, :-1] = w
+            fused[-1, :-1] = b
+            fused[-1, -1] = 1.0
+            self.hidden.append(fused)
+        w, b = self.layers[-1]
+        self.output = np.vstack((w, b)).astype(np.float32)
+        self.input = np.ones(self.layers[0][0].shape[0] + 1, dtype=np.float32)
+
+    @classmethod
+    def fromStateDict(cls, stateDict):
+        """Build from a DQN state dict (Linear layers of model.DQN.net, in order)."""
+        weights = sorted((k for k in stateDict if k.endswith(".weight")), key=lambda k: int(k.split(".")[-2]))
+        layers = []
+        for weightKey in weights:
+            biasKey = weightKey[:-len("weight")] + "bias"
+            layers.append((stateDict[weightKey].detach().cpu().numpy().T, stateDict[biasKey].detach().cpu().numpy()))
+        return cls(layers)
+
+    @classmethod
+    def fromFile(cls, path):
+        """Load a .pth DQN state dict or an .npz written by save()."""
+        if path.endswith(".npz"):
+            data = np.load(path)
+            count = len(data.files) // 2
+            return cls([(data[f"w{i}"], data[f"b{i}"]) for i in range(count)])
+        return cls.fromStateDict(torch.load(path, map_location="cpu"))
+
+    def save(self, path):
+        """Write the compact export (.npz of float32 weights)."""
+        arrays = {}
+        for i, (w, b) in enumerate(self.layers):
+            arrays[f"w{i}"] = w
+            arrays[f"b{i}"] = b
+        np.savez(path, **arrays)
+
+    def qValues(self, states):
+        x = np.asarray(states, dtype=np.float32)
+        last = len(self.layers) - 1
+        for i, (w, b) in enumerate(self.layers):
+            x = x @ w
+            x += b
+            if i != last:
+                np.maximum(x, 0, out=x)
+        return x
+
+    def act(self, state):
+        """Greedy action for a single state."""
+        x = self.input
+        x[:-1] = state
+        for w in self.hidden:
+            x = np.dot(x, w)
+            np.maximum(x, 0, out=x)
+        return int(np.dot(x, self.output).argmax())
+
+    def actBatch(self, states):
+        """Greedy actions for an (N, stateDim) array."""
+        return self.qValues(states).argmax(axis=1)
+
+
+def freezePolicy(model, stateDim=5):
+    """torch.jit-traced, frozen and inference-optimized copy of a DQN, for torch-based callers."""
+    model = model.cpu().eval()
+    traced = torch.jit.trace(model, torch.zeros(1, stateDim))
+    return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+
+
+def timeCall(fn, states, iterations):
+    for state in states[:100]:
+        fn(state)
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(states[i % len(states)])
+    return (time.perf_counter() - start) / iterations
+
+
+def benchmark(path, iterations=20000, seed=0):
+    """Compare per-action latency of DQNAgent.act, the NumPy policy and a frozen TorchScript module."""
+    from agent import DQNAgent
+
+    torch.set_num_threads(1)
+    states = np.random.default_rng(seed).random((1000, 5))
+    agent = DQNAgent(stateDim=5, actionDim=3)
+    agent.load(path)
+    agent.epsilon = 0.0
+    policy = NumpyPolicy.fromFile(path)
+
+    mismatches = sum(agent.act(s) != policy.act(s) for s in states)
+    results = {
+        "DQNAgent.act": timeCall(agent.act, states, iterations),
+        "NumpyPolicy.act": timeCall(policy.act, states, iterations),
+    }
+    try:
+        frozen = freezePolicy(agent.model)
+        def frozenAct(state):
+            with torch.inference_mode():
+                return frozen(torch.from_numpy(np.asarray(state, dtype=np.float32)).unsqueeze(0)).argmax().item()
+        results["torch.jit frozen"] = timeCall(frozenAct, states, iterations)
+    except (RuntimeError, AttributeError) as e:
+        print(f"Skipping torch.jit: {e}")
+
+    baseline = results["DQNAgent.act"]
+    for name, seconds in results.items():
+        print(f"{name:<20} {seconds * 1e6:8.2f} us/action  {baseline / seconds:6.1f}x")
+    print(f"Greedy action mismatches vs DQNAgent.act: {mismatches}/{len(states)}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a DQN for fast CPU inference and benchmark it")
+    parser.add_argument("model", help=".pth state dict")
+    parser.add_argument("--export", help="write the compact NumPy export (.npz) here")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    if args.export:
+        NumpyPolicy.fromFile(args.model).save(args.export)
+        print(f"Exported {args.model} to {args.export}")
+    benchmark(args.model, args.iterations)
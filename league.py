@@ -0,0 +1,267 @@
+# league.py
+import argparse
+import copy
+import os
+import time
+import numpy as np
+from environment import VectorPongEnv
+from agent import DQNAgent, spawnSeeds
+from inference import NumpyPolicy
+
+
+class PolicyPool:
+    def __init__(self, maxSize, numLearners, minGames=20, seed=None):
+        """Fixed-size pool of frozen policy snapshots used as opponents.
+
+        Weights of every member are stacked into preallocated (maxSize, inputs, outputs)
+        arrays so snapshots are plain array copies and inference needs no per-member
+        objects. Per-learner win/game counts against each member drive opponent sampling.
+        """
+        self.maxSize = maxSize
+        self.minGames = minGames
+        self.rng = np.random.default_rng(seed)
+        self.layers = None
+        self.names = [None] * maxSize
+        self.addedAt = np.zeros(maxSize, dtype=np.int64)
+        self.size = 0
+        self.added = 0
+        self.wins = np.zeros((numLearners, maxSize))
+        self.games = np.zeros((numLearners, maxSize))
+
+    def add(self, policy, name):
+        """Store a NumpyPolicy snapshot, replacing the member learners beat most once the pool is full."""
+        if self.layers is None:
+            self.layers = [(np.zeros((self.maxSize,) + w.shape, dtype=np.float32),
+                            np.zeros((self.maxSize,) + b.shape, dtype=np.float32)) for w, b in policy.layers]
+        if self.size < self.maxSize:
+            slot = self.size
+            self.size += 1
+        else:
+            slot = self.evictionSlot()
+        for (weights, biases), (w, b) in zip(self.layers, policy.layers):
+            weights[slot] = w
+            biases[slot] = b
+        self.names[slot] = name
+        self.addedAt[slot] = self.added
+        self.wins[:, slot] = 0
+        self.games[:, slot] = 0
+        self.added += 1
+        return slot
+
+    def evictionSlot(self):
+        games = self.games[:, :self.size].sum(axis=0)
+        measured = games >= self.minGames
+        if not measured.any():
+            return int(self.addedAt[:self.size].argmin())  # Nothing measured yet: replace the oldest
+        # Members without enough games are never evicted before they've been measured
+        winRate = np.where(measured, self.wins[:, :self.size].sum(axis=0) / np.maximum(games, 1), -1.0)
+        return int(winRate.argmax())
+
+    def winRates(self, learner):
+        """Learner's win rate against each member; 0.5 (unknown) until a member has been played."""
+        games = self.games[learner, :self.size]
+        return np.where(games > 0, self.wins[learner, :self.size] / np.maximum(games, 1), 0.5)
+
+    def sample(self, learner, count, power=2.0):
+        """Prioritized fictitious self-play: favour members this learner beats least, weight (1 - winRate)^power."""
+        weights = (1.0 - self.winRates(learner)) ** power + 1e-3
+        return self.rng.choice(self.size, size=count, p=weights / weights.sum())
+
+    def record(self, learner, members, won):
+        np.add.at(self.games[learner], members, 1)
+        np.add.at(self.wins[learner], members, won)
+
+    def actBatch(self, states, members):
+        """Greedy actions for each row of states under its own member's weights.
+
+        Rows are grouped by member and each group runs as one matmul chain, so the cost
+        grows with the number of distinct opponents in play (at most the batch size), not
+        with the pool size.
+        """
+        states = np.asarray(states, dtype=np.float32)
+        actions = np.empty(len(states), dtype=np.int64)
+        order = np.argsort(members, kind="stable")
+        uniqueMembers, starts = np.unique(members[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        last = len(self.layers) - 1
+        for member, start, end in zip(uniqueMembers.tolist(), starts.tolist(), ends.tolist()):
+            rows = order[start:end]
+            x = states[rows]
+            for i, (weights, biases) in enumerate(self.layers):
+                x = x @ weights[member]
+                x += biases[member]
+                if i != last:
+                    np.maximum(x, 0, out=x)
+            actions[rows] = x.argmax(axis=1)
+        return actions
+
+
+class League:
+    def __init__(self, numLearners=4, numEnvs=32, poolSize=32, opponentsInPlay=4, snapshotEvery=5000,
+                 exploitEvery=20000, batchSize=64, trainEvery=4, warmupSteps=2000, bufferSize=100_000, lr=0.001,
+                 exploitMinGames=100, seed=None):
+        """Population of DQN learners trained against a pool of their own frozen snapshots.
+
+        Each learner plays the left paddle in numEnvs vectorized games. Its right paddles
+        come from opponentsInPlay pool members drawn by PFSP; a new one is picked from that
+        set whenever a game ends, and the set is redrawn at every snapshot. Opponent
+        inference is one batched matmul chain per member in play, so per-tick cost does
+        not grow with poolSize. Every
+        snapshotEvery ticks each learner adds a snapshot of itself to the pool, and every
+        exploitEvery ticks the worst learners (by recent win rate) copy the weights and
+        optimizer state of a better one and perturb their learning rate (population-based
+        training). Only learners with at least exploitMinGames finished games take part.
+        """
+        self.numLearners = numLearners
+        self.numEnvs = numEnvs
+        self.snapshotEvery = snapshotEvery
+        self.exploitEvery = exploitEvery
+        self.exploitMinGames = exploitMinGames
+        self.batchSize = batchSize
+        self.trainEvery = trainEvery
+        self.warmupSteps = warmupSteps
+        leagueSeed, poolSeed, *childSeeds = spawnSeeds(seed, 2 + 2 * numLearners)
+        learnerSeeds, envSeeds = childSeeds[:numLearners], childSeeds[numLearners:]
+        self.rng = np.random.default_rng(leagueSeed)
+        self.ticks = 0
+
+        self.learners = [DQNAgent(stateDim=5, actionDim=3, lr=lr, gamma=0.99, epsilon=1.0, epsilonDecay=0.9995,
+                                  epsilonMin=0.05, bufferSize=bufferSize, seed=s) for s in learnerSeeds]
+        self.envs = [VectorPongEnv(numEnvs, seed=s) for s in envSeeds]
+        self.pool = PolicyPool(poolSize, numLearners, seed=poolSeed)
+        for i, learner in enumerate(self.learners):
+            self.snapshot(i)
+
+        self.opponentsInPlay = opponentsInPlay
+        self.inPlay = [self.pool.sample(i, opponentsInPlay) for i in range(numLearners)]
+        self.members = [self.rng.choice(self.inPlay[i], size=numEnvs) for i in range(numLearners)]
+        # Games whose opponent slot was overwritten mid-game; their result is not credited to any member
+        self.unscored = [np.zeros(numEnvs, dtype=bool) for _ in range(numLearners)]
+        self.states = [env.getState('player') for env in self.envs]
+        self.opponentStates = [env.getState('opponent') for env in self.envs]
+        # Exponential moving average of each learner's game results, for exploit/explore
+        self.recentWinRate = np.full(numLearners, 0.5)
+        self.gamesPlayed = np.zeros(numLearners, dtype=np.int64)
+
+    def snapshot(self, learner):
+        """Add the learner's current weights to the pool; returns the slot it overwrote, or None."""
+        evicting = self.pool.size == self.pool.maxSize
+        policy = NumpyPolicy.fromStateDict(self.learners[learner].model.state_dict())
+        slot = self.pool.add(policy, f"learner{learner}@{self.ticks}")
+        return slot if evicting else None
+
+    def retireGames(self, slots):
+        """Move games playing against overwritten slots to a current opponent and leave them unscored."""
+        for i, members in enumerate(self.members):
+            affected = np.isin(members, slots)
+            if affected.any():
+                members[affected] = self.rng.choice(self.inPlay[i], size=int(affected.sum()))
+                self.unscored[i] |= affected
+
+    def step(self):
+        """Advance every learner's games by one tick, learning and updating league statistics."""
+        for i, (learner, env) in enumerate(zip(self.learners, self.envs)):
+            states, members = self.states[i], self.members[i]
+            actions = learner.actBatch(states)
+            opponentActions = self.pool.actBatch(self.opponentStates[i], members)
+            nextStates, opponentNextStates, rewards, _, dones = env.step(actions, opponentActions)
+            # Finished games are already reset, but their next state is masked by done in the TD target
+            learner.replayBuffer.push_batch(states, actions, rewards, nextStates, dones)
+
+            if dones.any():
+                finished = np.flatnonzero(dones)
+                won = (env.finalPlayerScore[finished] > env.finalOpponentScore[finished]).astype(np.float64)
+                scored = ~self.unscored[i][finished]
+                self.pool.record(i, members[finished][scored], won[scored])
+                self.unscored[i][finished] = False
+                for result in won.tolist():
+                    self.recentWinRate[i] += 0.02 * (result - self.recentWinRate[i])
+                self.gamesPlayed[i] += len(finished)
+                members[finished] = self.rng.choice(self.inPlay[i], size=len(finished))
+
+            self.states[i], self.opponentStates[i] = nextStates, opponentNextStates
+            if self.ticks >= self.warmupSteps and self.ticks % self.trainEvery == 0:
+                learner.train(self.batchSize)
+
+        self.ticks += 1
+        if self.ticks % self.snapshotEvery == 0:
+            replaced = [self.snapshot(i) for i in range(self.numLearners)]
+            self.inPlay = [self.pool.sample(i, self.opponentsInPlay) for i in range(self.numLearners)]
+            replaced = [slot for slot in replaced if slot is not None]
+            if replaced:
+                self.retireGames(replaced)
+        if self.ticks % self.exploitEvery == 0:
+            self.exploit()
+
+    def exploit(self):
+        """Bottom quarter of learners copy a random top-quarter learner, then perturb their learning rate."""
+        # Win rates start at 0.5 for everyone, so rank only learners with enough games behind them
+        candidates = np.flatnonzero(self.gamesPlayed >= self.exploitMinGames)
+        if len(candidates) < 2:
+            return
+        count = max(1, len(candidates) // 4)
+        ranking = candidates[np.argsort(self.recentWinRate[candidates])]
+        for loser in ranking[:count].tolist():
+            winner = int(self.rng.choice(ranking[-count:]))
+            if self.recentWinRate[winner] <= self.recentWinRate[loser]:
+                continue
+            source, target = self.learners[winner], self.learners[loser]
+            target.model.load_state_dict(source.model.state_dict())
+            target.targetModel.load_state_dict(source.targetModel.state_dict())
+            # state_dict() returns the live moment tensors; copy them so the two learners diverge
+            target.optimizer.load_state_dict(copy.deepcopy(source.optimizer.state_dict()))
+            target.epsilon = source.epsilon
+            for group in target.optimizer.param_groups:
+                group["lr"] *= float(self.rng.choice((0.8, 1.25)))
+            self.recentWinRate[loser] = self.recentWinRate[winner]
+            print(f"League: learner {loser} <- learner {winner} (lr {target.optimizer.param_groups[0]['lr']:.2e})")
+
+    def report(self):
+        for i, learner in enumerate(self.learners):
+            print(f"  learner {i}: games {self.gamesPlayed[i]}, recent win rate {self.recentWinRate[i]:.2f}, "
+                  f"epsilon {learner.epsilon:.3f}, lr {learner.optimizer.param_groups[0]['lr']:.2e}")
+
+    def save(self, directory):
+        """Save each learner's weights and every pool member as a NumPy export."""
+        os.makedirs(directory, exist_ok=True)
+        for i, learner in enumerate(self.learners):
+            learner.save(os.path.join(directory, f"league_learner_{i}.pth"))
+        for slot in range(self.pool.size):
+            layers = [(weights[slot], biases[slot]) for weights, biases in self.pool.layers]
+            name = self.pool.names[slot].replace("@", "_")
+            NumpyPolicy(layers).save(os.path.join(directory, f"pool_{name}.npz"))
+
+
+def trainLeague(totalTicks=200_000, reportEvery=10.0, saveDir=None, **leagueArgs):
+    league = League(**leagueArgs)
+    start = time.perf_counter()
+    lastReport = start
+    while league.ticks < totalTicks:
+        league.step()
+        now = time.perf_counter()
+        if now - lastReport >= reportEvery:
+            steps = league.ticks * league.numLearners * league.numEnvs
+            print(f"Ticks: {league.ticks}, env steps/s: {steps / (now - start):.0f}, pool size: {league.pool.size}")
+            league.report()
+            lastReport = now
+    if saveDir:
+        league.save(saveDir)
+    return league
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Population-based self-play league against a frozen-opponent pool")
+    parser.add_argument("--learners", type=int, default=4)
+    parser.add_argument("--envs", type=int, default=32, help="vectorized games per learner")
+    parser.add_argument("--pool-size", type=int, default=32)
+    parser.add_argument("--opponents-in-play", type=int, default=4, help="distinct pool members each learner faces at once")
+    parser.add_argument("--ticks", type=int, default=200_000)
+    parser.add_argument("--snapshot-every", type=int, default=5000)
+    parser.add_argument("--exploit-every", type=int, default=20000)
+    parser.add_argument("--exploit-min-games", type=int, default=100, help="finished games a learner needs before it is ranked")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--save", default="models/v3/league")
+    args = parser.parse_args()
+    trainLeague(totalTicks=args.ticks, saveDir=args.save, numLearners=args.learners, numEnvs=args.envs,
+                poolSize=args.pool_size, opponentsInPlay=args.opponents_in_play, snapshotEvery=args.snapshot_every, exploitEvery=args.exploit_every,
+                exploitMinGames=args.exploit_min_games, seed=args.seed)
@@ -1,11 +1,19 @@
 # main.py
 import pygame
 from environment import PongEnv
-from agent import DQNAgent
+from agent import DQNAgent, spawnSeeds
+from checkpoint import CheckpointWriter
+from inference import NumpyPolicy
+from profiler import NULL_PROFILER
+from recording import EpisodeRecorder
+from renderer import Spectator
+from telemetry import TelemetryWriter
+from scripted import ScriptedPolicy
 import random
 import pygame
 import time
 import os
+import numpy as np
 """
 TODO: 
 - Give reward for hitting the ball
@@ -14,15 +22,90 @@ TODO:
 - Refactor for steps
 """
 
-def train(modelPathPlayer=None, modelPathOpponent=None, startFrom=0, humanMode=False):
-    env = PongEnv()
-    playerAgent = DQNAgent(stateDim=5, actionDim=3)  # State: ball.x, ball.y, ball.speed[0](x), ball.speed[1](y), player.y Actions: 0=up, 1=down, 2=stay
+def train(modelPathPlayer=None, modelPathOpponent=None, startFrom=0, humanMode=False,
+          renderEvery=1, renderUnit="steps", fps=60,
+          batchSize=64, trainEvery=1, updatesPerTrain=2, warmupSteps=0,
+          checkpointDir="models/v3/checkpoints", checkpointEvery=10, keepCheckpoints=3, resume=None,
+          weightsDir=None, weightsEvery=10, keepWeights=5,
+          profiler=None, frameSkip=1, seed=None, recordDir=None, opponent="self", interceptFeature=False,
+          replayDir=None, bufferSize=10000, spectate=False, telemetryPath=None, telemetryEvery=1000):
+    """Self-play training loop.
+
+    renderEvery/renderUnit control how often the game is drawn: every N "steps", every
+    N-th "episodes" (all frames of those episodes), or never when renderEvery is 0/None.
+    fps caps the frame rate of rendered frames only (0 = uncapped); unrendered steps run
+    as fast as the CPU allows. Human control only acts on rendered frames; once the
+    window is open its events are also polled every 100 steps in between, so it stays
+    responsive and can be closed during unrendered episodes.
+
+    Learning schedule: after warmupSteps env steps, do updatesPerTrain gradient updates
+    of batchSize every trainEvery env steps. The defaults (two updates of 64 every step)
+    match the original loop; fewer, larger updates make much better use of the hardware.
+
+    Every checkpointEvery episodes a full training checkpoint (weights, target network,
+    optimizer, epsilon, step counter, replay buffer, RNG state) is written to
+    checkpointDir on a background thread, keeping the newest keepCheckpoints files.
+    resume takes a checkpoint path, or "latest" for the newest one in checkpointDir,
+    and continues from exactly where it was written.
+
+    Every weightsEvery episodes the bare model weights are also exported as
+    pong_model_<episode>_v3.pth (loadable by DQNAgent.load and test()) into weightsDir,
+    by default the parent of checkpointDir, through a second background writer that
+    keeps the newest keepWeights files.
+
+    profiler takes a profiler.Profiler to time env stepping, action selection, replay
+    push/sample, the learner stages and rendering; without one nothing is recorded.
+
+    frameSkip repeats each chosen action for that many physics ticks, so inference,
+    replay pushes and learning happen once per decision instead of once per tick.
+
+    seed makes the run reproducible (env serves, exploration, replay sampling, weight
+    init). With recordDir set, every episode is saved there as a compact recording
+    (episode seed + actions) that recording.py can replay bit-exactly.
+
+    opponent="scripted" plays the right paddle with ScriptedPolicy (analytic ball
+    intercept, no forward pass) instead of self-play; its transitions still go into
+    replay. interceptFeature adds the predicted intercept as a sixth state feature.
+
+    replayDir keeps the replay buffer (bufferSize transitions) in memory-mapped files
+    there instead of RAM, so it can be very large and survives restarts; checkpoints
+    then only record the buffer's position rather than its contents.
+
+    spectate=True opens a viewer window in a separate process that shows the game as
+    fast as it can draw; training never waits for it (frames it can't keep up with are
+    dropped), so it can be left on during headless runs.
+
+    telemetryPath appends a JSON-lines log there (written on a background thread): one
+    "episode" record per episode (rewards, score, epsilon, hits, rally lengths) and one
+    "steps" record every telemetryEvery env steps (loss and Q-value statistics of the
+    updates since the previous one). `python telemetry.py summary|plot` reads it back.
+    """
+    envSeed, agentSeed = spawnSeeds(seed, 2)
+    env = PongEnv(headless=True, frameSkip=frameSkip, seed=envSeed, interceptFeature=interceptFeature)  # The window is opened on the first rendered frame
+    playerAgent = DQNAgent(stateDim=env.stateDim, actionDim=3, bufferSize=bufferSize, seed=agentSeed, replayDir=replayDir)  # State: ball.x, ball.y, ball.speed[0](x), ball.speed[1](y), player.y Actions: 0=up, 1=down, 2=stay
+    profiler = profiler or NULL_PROFILER
+    playerAgent.profiler = profiler
     #opponentAgent = DQNAgent(stateDim=5, actionDim=3)  # For right paddle 
     clock = pygame.time.Clock()
     episodes = 10000
-    batchSize = 64
+    eventPollEvery = 100  # Steps between window event checks while not rendering
+    checkpoints = CheckpointWriter(checkpointDir, prefix="pong_checkpoint", keepLast=keepCheckpoints)
+    weights = CheckpointWriter(weightsDir or os.path.dirname(os.path.normpath(checkpointDir)) or ".",
+                               prefix="pong_model", suffix="_v3.pth", keepLast=keepWeights)
+    totalSteps = 0
 
-    if modelPathOpponent and modelPathPlayer:
+    if resume == "latest":
+        resume = checkpoints.latest()
+        if resume is None:
+            print(f"No checkpoint found in {checkpointDir}, starting training from scratch.")
+    if resume:
+        progress = playerAgent.loadCheckpoint(resume)
+        startFrom = progress["episode"] + 1
+        totalSteps = progress["totalSteps"]
+        if "envRng" in progress:
+            env.rng.setstate(progress["envRng"])
+        print(f"Resumed from {resume} at episode {startFrom}, step {totalSteps}")
+    elif modelPathOpponent and modelPathPlayer:
         try:
             playerAgent.load(modelPathPlayer)
             #opponentAgent.load(modelPathOpponent)
@@ -33,14 +116,30 @@ def train(modelPathPlayer=None, modelPathOpponent=None, startFrom=0, humanMode=F
         except FileNotFoundError as e:
             print(f"Error loading models: {e}")
             env.close()
+            checkpoints.close()
+            weights.close()
             return
-    else:
+    elif resume is None:
         print("No models provided, starting training from scratch.")
 
-    print("Pure self play as same agent controls both paddles.")
+    if opponent == "scripted":
+        scriptedOpponent = ScriptedPolicy(env, side='opponent')
+        print("Training against the scripted intercept opponent.")
+    else:
+        scriptedOpponent = None
+        print("Pure self play as same agent controls both paddles.")
 
+    spectator = Spectator(fps=fps or 60) if spectate else None
+    telemetry = TelemetryWriter(telemetryPath) if telemetryPath else None
+    playerAgent.recordStats = telemetry is not None
     for episode in range(startFrom, episodes):
-        env.reset()
+        renderEpisode = bool(renderEvery) and (renderUnit != "episodes" or episode % renderEvery == 0)
+        if recordDir:
+            # Each episode gets its own seed drawn from the env stream so it can be replayed alone
+            recorder = EpisodeRecorder(env, env.rng.getrandbits(63))
+        else:
+            recorder = None
+            env.reset()
         playerState = env.getState(perspective='player')
         opponentState = env.getState(perspective='opponent')
         playerTotalReward = 0
@@ -49,76 +148,128 @@ def train(modelPathPlayer=None, modelPathOpponent=None, startFrom=0, humanMode=F
         done = False
 
         while not done:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    env.close()
-                    return
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_h:
-                        humanMode = not humanMode
+            renderFrame = renderEpisode and (renderUnit == "episodes" or totalSteps % renderEvery == 0)
+            totalSteps += 1
+            # Keep an open window responsive (and closable) through unrendered stretches too
+            if env.screen is not None and (renderFrame or totalSteps % eventPollEvery == 0):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        env.close()
+                        checkpoints.close()
+                        weights.close()
+                        profiler.close()
+                        if spectator:
+                            spectator.close()
+                        if telemetry:
+                            telemetry.close()
+                        if replayDir:
+                            playerAgent.replayBuffer.close()
+                        return
+                    if event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_h:
+                            humanMode = not humanMode
+
+            with profiler.section("agent.act"):
+                if scriptedOpponent:
+                    playerAction = playerAgent.act(playerState)
+                    opponentAction = scriptedOpponent.act(opponentState)
+                else:
+                    # Both paddles are driven by the same agent, so pick their actions in one forward pass
+                    playerAction, opponentAction = playerAgent.actBatch(np.stack((playerState, opponentState))).tolist()
 
             # Player action
-            if humanMode:
+            if humanMode and renderFrame and env.screen is not None:
                 keys = pygame.key.get_pressed()
                 playerAction = 2  # Stay
                 if keys[pygame.K_UP]:
                     playerAction = 0  # Up
                 if keys[pygame.K_DOWN]:
                     playerAction = 1  # Down
-            else:
-                playerAction = playerAgent.act(playerState)
-
-            # Opponent action (self-play or random in human mode)
-            opponentAction = playerAgent.act(opponentState)  #opentAgent.act(opponentState)
 
-            playerNextState, opponentNextState, playerReward, opponentReward, done = env.step(playerAction, opponentAction)
-            playerAgent.replayBuffer.push(playerState, playerAction, playerReward, playerNextState, done)
-            playerAgent.replayBuffer.push(opponentState, opponentAction, opponentReward, opponentNextState, done) # oppenentAgent.replayBufffer
+            with profiler.section("env.step"):
+                playerNextState, opponentNextState, playerReward, opponentReward, done = env.step(playerAction, opponentAction)
+            profiler.count("envSteps")
+            if recorder:
+                recorder.record(playerAction, opponentAction)
+            with profiler.section("replay.push"):
+                playerAgent.replayBuffer.push(playerState, playerAction, playerReward, playerNextState, done)
+                playerAgent.replayBuffer.push(opponentState, opponentAction, opponentReward, opponentNextState, done) # oppenentAgent.replayBufffer
             playerState = playerNextState
             opponentState = opponentNextState
             playerTotalReward += playerReward
             opponentTotalReward += opponentReward
-            playerAgent.train(batchSize)
-            #print("Player trained")
-            playerAgent.train(batchSize) # opponentAgent.train(batchSize)
-            #print("Opponent trained")
+            if totalSteps > warmupSteps and totalSteps % trainEvery == 0:
+                for _ in range(updatesPerTrain):
+                    playerAgent.train(batchSize) # opponentAgent.train(batchSize)
             # Render and control frame rate
-            env.render(episode=episode + 1)
-            clock.tick(60)
+            if renderFrame:
+                with profiler.section("render"):
+                    env.render(episode=episode + 1)
+                if fps:
+                    clock.tick(fps)
+            if spectator:
+                spectator.publish(env, episode + 1)
+            if telemetry and totalSteps % telemetryEvery == 0:
+                telemetry.log("steps", steps=totalSteps, episode=episode + 1, epsilon=playerAgent.epsilon,
+                              **playerAgent.popTrainStats())
+            profiler.maybeReport()
 
             if done:
                 #playerAgent.updateTargetModel()
                 #opponentAgent.updateTargetModel()
                 print(f"Episode {episode + 1}, Player Reward: {playerTotalReward}, Opponent Reward: {opponentTotalReward}, "
                       f"Player Epsilon: {playerAgent.epsilon:.2f}, Opponent Epsilon: {playerAgent.epsilon:.2f}") # opponentAgent.epsilon:.2f}")
+                if telemetry:
+                    logEpisode(telemetry, "episode", env, episode + 1, steps=totalSteps, epsilon=playerAgent.epsilon,
+                               playerReward=playerTotalReward, opponentReward=opponentTotalReward)
+                if recorder:
+                    os.makedirs(recordDir, exist_ok=True)
+                    recorder.save(os.path.join(recordDir, f"episode_{episode + 1}.pongrec"))
                 break
 
-        # Save model periodically
-        if episode % 10 == 0:
-            playerAgent.save(f"models/v3/pong_model_{episode}_v3.pth")
+        # Export weights periodically; CPU copies so training can keep updating the live model
+        if episode % weightsEvery == 0:
+            weights.save({k: v.detach().cpu().clone() for k, v in playerAgent.model.state_dict().items()}, episode)
             #opponentAgent.save(f"models/v2/pong_opponent_model_{episode}_v2.pth")
-            # remove previous model 
-            #if episode > 10: 
-            #    os.remove(f"models/v3/pong_model_{episode - 5}_v3.pth")
+        # Full training checkpoint; written in the background, old ones pruned by the writer
+        if episode % checkpointEvery == 0:
+            checkpoints.save(playerAgent.checkpointState(episode=episode, totalSteps=totalSteps,
+                                                         envRng=env.rng.getstate()), episode)
+
+    checkpoints.close()
+    weights.close()
+    profiler.close()
+    if spectator:
+        spectator.close()
+    if telemetry:
+        telemetry.close()
+    if replayDir:
+        playerAgent.replayBuffer.close()  # Publish the final position so the store can be reopened
 
-def test(modelPathPlayer="pong_model_100.pth", modelPathOpponent="pong_opponent_model_100.pth", humanMode=False):
+def logEpisode(telemetry, kind, env, episode, **fields):
+    """Write one per-episode record with the env's score and rally statistics."""
+    hits = env.playerHits + env.opponentHits
+    points = env.playerScore + env.opponentScore
+    telemetry.log(kind, episode=episode, playerScore=env.playerScore, opponentScore=env.opponentScore,
+                  playerHits=env.playerHits, opponentHits=env.opponentHits,
+                  meanRally=hits / points if points else 0.0,
+                  longestRally=max(env.longestRally, env.rallyHits), **fields)
+
+def test(modelPathPlayer="pong_model_100.pth", modelPathOpponent="pong_opponent_model_100.pth", humanMode=False,
+         telemetryPath=None):
     env = PongEnv()
-    playerAgent = DQNAgent(stateDim=5, actionDim=3)  # Actions: 0=up, 1=down, 2=stay
-    opponentAgent = DQNAgent(stateDim=5, actionDim=3)  # For right paddle 
 
+    # Greedy play only, so use the NumPy inference path instead of full agents (no exploration)
     try:
-        playerAgent.load(modelPathPlayer)
-        opponentAgent.load(modelPathOpponent)
+        playerAgent = NumpyPolicy.fromFile(modelPathPlayer)  # Actions: 0=up, 1=down, 2=stay
+        opponentAgent = NumpyPolicy.fromFile(modelPathOpponent)  # For right paddle
         print(f"Models loaded from {modelPathPlayer} and {modelPathOpponent}")
     except FileNotFoundError as e:
         print(f"Error loading models: {e}")
         env.close()
         return
 
-    # Disable exploration (set epsilon to 0 for deterministic actions)
-    playerAgent.epsilon = 0.0
-    opponentAgent.epsilon = 0.0
-
+    telemetry = TelemetryWriter(telemetryPath) if telemetryPath else None
     clock = pygame.time.Clock()
     episodes = 10  # Number of test episodes
     font = pygame.font.Font(None, 74)
@@ -136,6 +287,8 @@ def test(modelPathPlayer="pong_model_100.pth", modelPathOpponent="pong_opponent_
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     env.close()
+                    if telemetry:
+                        telemetry.close()
                     return
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_h:
@@ -186,6 +339,9 @@ def test(modelPathPlayer="pong_model_100.pth", modelPathOpponent="pong_opponent_
 
             if done:
                 print(f"Test Episode {episode + 1}, Player Score: {env.playerScore}, Opponent Score: {env.opponentScore}")
+                if telemetry:
+                    logEpisode(telemetry, "testEpisode", env, episode + 1,
+                               playerReward=playerTotalReward, opponentReward=opponentTotalReward)
                 playerScore += 1 if env.playerScore > env.opponentScore else 0
                 oppScore += 1 if env.opponentScore > env.playerScore else 0
                 print(f"Score: {playerScore} - {oppScore}")
@@ -205,6 +361,8 @@ def test(modelPathPlayer="pong_model_100.pth", modelPathOpponent="pong_opponent_
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     env.close()
+                    if telemetry:
+                        telemetry.close()
                     return
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_SPACE:
@@ -215,9 +373,22 @@ def test(modelPathPlayer="pong_model_100.pth", modelPathOpponent="pong_opponent_
         # Clear event queue to prevent residual inputs
         pygame.event.clear()
 
+    if telemetry:
+        telemetry.close()
+
 
 if __name__ == "__main__":
     #train()
+    #train(renderEvery=0)  # Headless: no window, no frame cap
+    #train(renderEvery=50, renderUnit="episodes")  # Watch every 50th episode at 60 FPS
+    #train(renderEvery=0, resume="latest")  # Continue the last run from its newest checkpoint
+    #train(renderEvery=0, profiler=Profiler(reportEvery=30, csvPath="profile.csv"))  # With: from profiler import Profiler
+    #train(renderEvery=0, spectate=True)  # Full-speed headless training with a separate viewer window
+    #train(renderEvery=0, telemetryPath="telemetry.jsonl")  # Then: python telemetry.py summary telemetry.jsonl
+    #train(renderEvery=0, frameSkip=4)  # One decision per 4 physics ticks
+    #train(renderEvery=0, seed=1234, recordDir="recordings")  # Reproducible run, every episode replayable
+    #train(renderEvery=0, opponent="scripted", interceptFeature=True)  # Cheap fixed opponent, richer state
+    #train(renderEvery=0, batchSize=256, trainEvery=8, updatesPerTrain=1, warmupSteps=5000)
     #train(modelPathPlayer="./models/v2/pong_model_600_v2.pth", modelPathOpponent="./models/v2/pong_opponent_model_600_v2.pth", startFrom=601)
     print("Testing 1000 episodes V2 model vs 30 episodes V3 model")
     test(modelPathPlayer="./models/v2/pong_model_1000_v2.pth", modelPathOpponent="./models/v3/pong_model_90_v3.pth", humanMode=False)
\ No newline at end of file
@@ -1,7 +1,9 @@
 import torch
 import torch.nn as nn
-from collections import deque
-import random
+import json
+import mmap
+import os
+import numpy as np
 
 """
 class DQN(nn.Module):
@@ -48,14 +50,337 @@ class DQN(nn.Module):
         return self.net(x)
     
 class ReplayBuffer:
-    def __init__(self, capacity):
-        self.buffer = deque(maxlen=capacity)
+    def __init__(self, capacity, state_dim, device="cpu", seed=None):
+        """Circular experience store backed by preallocated arrays, one per field."""
+        self.capacity = capacity
+        self.device = torch.device(device)
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+        self.size = 0
+        self.allocate(state_dim)
+
+    def allocate(self, state_dim):
+        """Create the per-field storage arrays."""
+        self.states = np.zeros((self.capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_states = np.zeros((self.capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
 
     def push(self, state, action, reward, next_state, done):
-        self.buffer.append((state, action, reward, next_state, done))
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        """Store a batch of transitions, e.g. one tick of a VectorPongEnv."""
+        count = len(actions)
+        idx = (self.position + np.arange(count)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
 
     def sample(self, batch_size):
-        return random.sample(self.buffer, batch_size)
+        """Return (states, actions, rewards, next_states, dones) as tensors on the buffer's device."""
+        idx = self.rng.integers(0, self.size, size=batch_size)
+        return self.gather(idx)
+
+    def gather(self, idx):
+        non_blocking = self.device.type == "cuda"
+        return tuple(
+            torch.from_numpy(field[idx]).to(self.device, non_blocking=non_blocking)
+            for field in (self.states, self.actions, self.rewards, self.next_states, self.dones)
+        )
+
+    def state_dict(self):
+        """Snapshot of the stored transitions (copies, safe to serialize from another thread)."""
+        n = self.size
+        return {
+            "capacity": self.capacity,
+            "position": self.position,
+            "size": n,
+            "states": self.states[:n].copy(),
+            "actions": self.actions[:n].copy(),
+            "rewards": self.rewards[:n].copy(),
+            "next_states": self.next_states[:n].copy(),
+            "dones": self.dones[:n].copy(),
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def load_state_dict(self, state):
+        n = state["size"]
+        if n > self.capacity:
+            raise ValueError(f"Checkpoint holds {n} transitions but buffer capacity is {self.capacity}")
+        self.states[:n] = state["states"]
+        self.actions[:n] = state["actions"]
+        self.rewards[:n] = state["rewards"]
+        self.next_states[:n] = state["next_states"]
+        self.dones[:n] = state["dones"]
+        self.size = n
+        self.position = state["position"] % self.capacity
+        if "rng" in state:
+            self.rng.bit_generator.state = state["rng"]
 
     def __len__(self):
-        return len(self.buffer)
\ No newline at end of file
+        return self.size
+
+
+class MemmapReplayBuffer(ReplayBuffer):
+    FIELDS = (
+        ("states", np.float32, True),
+        ("actions", np.uint8, False),
+        ("rewards", np.float32, False),
+        ("next_states", np.float32, True),
+        ("dones", np.uint8, False),
+    )
+
+    def __init__(self, capacity, state_dim, path, device="cpu", seed=None, read_only=False, flush_every=1000):
+        """Replay buffer whose fields are fixed-dtype memory-mapped files in directory `path`.
+
+        Reopening an existing directory resumes where it left off, so the store survives
+        restarts and can hold far more transitions than fit in RAM. With read_only=True
+        other processes can sample the same files while one writer fills them; refresh()
+        picks up the writer's progress, which is published every flush_every pushes. The
+        maps are shared, so publishing is just a meta.json write; dirty pages are only
+        forced to disk (msync) by flush(), which close() calls.
+        """
+        self.path = path
+        self.read_only = read_only
+        self.flush_every = flush_every
+        self.unpublished = 0
+        super().__init__(capacity, state_dim, device, seed)
+
+    def meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def read_meta(self):
+        try:
+            with open(self.meta_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def allocate(self, state_dim):
+        meta = self.read_meta()
+        if meta is None:
+            if self.read_only:
+                raise FileNotFoundError(f"No replay store at {self.path}")
+            os.makedirs(self.path, exist_ok=True)
+        elif meta["capacity"] != self.capacity or meta["state_dim"] != state_dim:
+            raise ValueError(f"Replay store at {self.path} has capacity {meta['capacity']} and state_dim "
+                             f"{meta['state_dim']}, expected {self.capacity} and {state_dim}")
+        self.state_dim = state_dim
+
+        mode = "rb" if self.read_only else ("r+b" if meta else "w+b")
+        access = mmap.ACCESS_READ if self.read_only else mmap.ACCESS_WRITE
+        self.maps = {}
+        for name, dtype, wide in self.FIELDS:
+            shape = (self.capacity, state_dim) if wide else (self.capacity,)
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            with open(os.path.join(self.path, f"{name}.bin"), mode) as f:
+                if meta is None:
+                    f.truncate(nbytes)
+                mapping = mmap.mmap(f.fileno(), nbytes, access=access)
+            # Sampling is random access: skip kernel read-ahead of neighbouring pages
+            if hasattr(mmap, "MADV_RANDOM"):
+                mapping.madvise(mmap.MADV_RANDOM)
+            self.maps[name] = mapping
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=mapping))
+
+        if meta is None:
+            self.publish()
+        else:
+            self.position = meta["position"]
+            self.size = meta["size"]
+            self.published = (self.position, self.size)
+
+    def write_meta(self):
+        # Atomic replace so readers never see a half-written file
+        tmp_path = self.meta_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"capacity": self.capacity, "state_dim": self.state_dim,
+                       "position": self.position, "size": self.size}, f)
+        os.replace(tmp_path, self.meta_path())
+
+    def push(self, state, action, reward, next_state, done):
+        if self.read_only:
+            raise PermissionError("Replay store was opened read-only")
+        super().push(state, action, reward, next_state, done)
+        self.unpublished += 1
+        if self.unpublished >= self.flush_every:
+            self.publish()
+
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        if self.read_only:
+            raise PermissionError("Replay store was opened read-only")
+        super().push_batch(states, actions, rewards, next_states, dones)
+        self.unpublished += len(actions)
+        if self.unpublished >= self.flush_every:
+            self.publish()
+
+    def publish(self):
+        """Publish position/size to readers; they share the pages, so no msync is needed."""
+        self.write_meta()
+        self.published = (self.position, self.size)
+        self.unpublished = 0
+
+    def flush(self):
+        """Force dirty pages to disk, then publish."""
+        if self.read_only:
+            return
+        for mapping in self.maps.values():
+            mapping.flush()
+        self.publish()
+
+    def refresh(self):
+        """Re-read the writer's published position/size (for read-only sharers)."""
+        meta = self.read_meta()
+        if meta is not None:
+            self.position = meta["position"]
+            self.size = meta["size"]
+            self.published = (self.position, self.size)
+
+    def sample(self, batch_size):
+        # Sorted indices walk each file in one direction, so nearby rows share page faults
+        idx = np.sort(self.rng.integers(0, self.size, size=batch_size))
+        return self.gather(idx)
+
+    def gather(self, idx):
+        non_blocking = self.device.type == "cuda"
+        fields = (self.states[idx], self.actions[idx].astype(np.int64), self.rewards[idx],
+                  self.next_states[idx], self.dones[idx].astype(np.float32))
+        return tuple(torch.from_numpy(np.asarray(field)).to(self.device, non_blocking=non_blocking)
+                     for field in fields)
+
+    def state_dict(self):
+        """The data already lives in the files, so checkpoints only record where and how far.
+
+        Position and size are the last published ones, which never run ahead of what
+        readers of meta.json see.
+        """
+        position, size = self.published
+        return {"path": self.path, "capacity": self.capacity, "position": position,
+                "size": size, "rng": self.rng.bit_generator.state}
+
+    def load_state_dict(self, state):
+        if "states" in state:
+            super().load_state_dict(state)
+            self.flush()
+            return
+        if os.path.abspath(state["path"]) != os.path.abspath(self.path):
+            raise ValueError(f"Checkpoint refers to replay store {state['path']}, this buffer uses {self.path}")
+        self.position = state["position"]
+        self.size = state["size"]
+        self.rng.bit_generator.state = state["rng"]
+        if not self.read_only:
+            self.publish()
+
+    def close(self):
+        self.flush()
+        for name, _, _ in self.FIELDS:
+            setattr(self, name, None)
+        self.maps = None  # Unmapped once the last array view is gone
+
+
+class SumTree:
+    def __init__(self, capacity):
+        """Binary tree whose internal nodes hold the sum of their children's priorities."""
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, idx):
+        return self.tree[idx + self.leaves]
+
+    def update(self, idx, priorities):
+        """Set leaf priorities and refresh their ancestors, one vectorized pass per tree level."""
+        nodes = np.asarray(idx) + self.leaves
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """Return the leaf index whose cumulative priority range contains each value (O(log n))."""
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while nodes[0] < self.leaves:
+            left = self.tree[2 * nodes]
+            goRight = values >= left
+            values -= left * goRight
+            nodes = 2 * nodes + goRight
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, capacity, state_dim, device="cpu", alpha=0.6, beta=0.4, beta_increment=1e-5, eps=1e-5, seed=None):
+        """Replay buffer that samples transitions in proportion to their TD-error priority."""
+        super().__init__(capacity, state_dim, device, seed)
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+        self.max_priority = 1.0
+
+    def push(self, state, action, reward, next_state, done):
+        # New transitions get the highest priority seen so far so they are replayed at least once
+        idx = self.position
+        super().push(state, action, reward, next_state, done)
+        self.tree.update([idx], self.max_priority ** self.alpha)
+
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        idx = (self.position + np.arange(len(actions))) % self.capacity
+        super().push_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, self.max_priority ** self.alpha)
+
+    def sample(self, batch_size):
+        """Return the usual tensors plus importance-sampling weights and the sampled indices."""
+        # Stratified draw: one value per equal-mass segment of the priority range
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+
+        probs = self.tree.get(idx) / self.tree.total()
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        weights = torch.from_numpy(weights.astype(np.float32)).to(self.device)
+        return self.gather(idx) + (weights, idx)
+
+    def state_dict(self):
+        state = super().state_dict()
+        state.update(tree=self.tree.tree.copy(), beta=self.beta, max_priority=self.max_priority)
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        if len(state["tree"]) == len(self.tree.tree):
+            self.tree.tree[:] = state["tree"]
+        else:
+            # Capacity changed: rebuild the tree from the saved leaf priorities
+            leaves = len(state["tree"]) // 2
+            self.tree.tree[:] = 0
+            self.tree.update(np.arange(self.size), state["tree"][leaves:leaves + self.size])
+        self.beta = state["beta"]
+        self.max_priority = state["max_priority"]
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
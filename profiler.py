@@ -0,0 +1,165 @@
+# profiler.py
+import csv
+import os
+import time
+import numpy as np
+
+
+class _Section:
+    """Reusable timer context for one named stage."""
+    __slots__ = ("samples", "start", "sync")
+
+    def __init__(self, sync):
+        self.samples = []
+        self.start = 0.0
+        self.sync = sync
+
+    def __enter__(self):
+        if self.sync is not None:
+            self.sync()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.sync is not None:
+            self.sync()
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullProfiler:
+    """Drop-in profiler that records nothing; the default everywhere instrumentation is wired in."""
+    enabled = False
+    _section = _NullSection()
+
+    def section(self, name):
+        return self._section
+
+    def count(self, name, n=1):
+        pass
+
+    def maybeReport(self):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler:
+    def __init__(self, reportEvery=10.0, csvPath=None, tensorboardDir=None, cudaSync=False, printReport=True):
+        """Collect per-stage timings and throughput counters, reporting every reportEvery seconds.
+
+        Reports are printed and optionally appended to csvPath and/or written as TensorBoard
+        scalars to tensorboardDir (needs the tensorboard package). With cudaSync=True each
+        section synchronizes CUDA on entry and exit so GPU work is attributed correctly.
+        """
+        self.enabled = True
+        self.reportEvery = reportEvery
+        self.printReport = printReport
+        self.sections = {}
+        self.counters = {}
+        self.start = time.perf_counter()
+        self.lastReport = self.start
+        self.sync = None
+        if cudaSync:
+            import torch
+            if torch.cuda.is_available():
+                self.sync = torch.cuda.synchronize
+
+        self.csvFile = None
+        if csvPath:
+            newFile = not os.path.exists(csvPath) or os.path.getsize(csvPath) == 0
+            self.csvFile = open(csvPath, "a", newline="")
+            self.csvWriter = csv.writer(self.csvFile)
+            if newFile:
+                self.csvWriter.writerow(["wallTime", "name", "count", "perSecond", "meanMs", "p50Ms", "p90Ms", "p99Ms", "maxMs"])
+
+        self.tensorboard = None
+        if tensorboardDir:
+            try:
+                from torch.utils.tensorboard import SummaryWriter
+            except ImportError as e:
+                raise ImportError("TensorBoard logging needs the tensorboard package (pip install tensorboard)") from e
+            self.tensorboard = SummaryWriter(tensorboardDir)
+
+    def section(self, name):
+        """Context manager timing one occurrence of a stage, e.g. `with profiler.section("env.step"):`."""
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = _Section(self.sync)
+        return section
+
+    def count(self, name, n=1):
+        """Add n to a throughput counter such as "envSteps" or "updates"."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def maybeReport(self):
+        """Cheap to call every loop iteration; emits a report once the interval has elapsed."""
+        now = time.perf_counter()
+        if now - self.lastReport >= self.reportEvery:
+            self.report(now)
+
+    def report(self, now=None):
+        now = now or time.perf_counter()
+        elapsed = max(now - self.lastReport, 1e-9)
+        wallTime = now - self.start
+        rows = []
+        for name, n in sorted(self.counters.items()):
+            rows.append((name, n, n / elapsed, None))
+        for name, section in sorted(self.sections.items()):
+            if section.samples:
+                rows.append((name, len(section.samples), len(section.samples) / elapsed,
+                             np.asarray(section.samples) * 1000.0))
+
+        lines = [f"[profile] {wallTime:.1f}s"]
+        for name, n, rate, ms in rows:
+            if ms is None:
+                lines.append(f"  {name:<18} {n:>9} {rate:>10.1f}/s")
+                stats = ["", "", "", "", ""]
+            else:
+                p50, p90, p99 = np.percentile(ms, (50, 90, 99))
+                share = 100.0 * ms.sum() / 1000.0 / elapsed
+                lines.append(f"  {name:<18} {n:>9} calls  mean {ms.mean():.3f}ms  p50 {p50:.3f}  "
+                             f"p90 {p90:.3f}  p99 {p99:.3f}  max {ms.max():.3f}  ({share:.1f}% of wall)")
+                stats = [ms.mean(), p50, p90, p99, ms.max()]
+            if self.csvFile is not None:
+                self.csvWriter.writerow([f"{wallTime:.3f}", name, n, f"{rate:.3f}"] +
+                                        [s if s == "" else f"{s:.6f}" for s in stats])
+            if self.tensorboard is not None:
+                step = int(wallTime)
+                self.tensorboard.add_scalar(f"{name}/perSecond", rate, step)
+                if ms is not None:
+                    for label, value in zip(("mean", "p50", "p90", "p99", "max"), stats):
+                        self.tensorboard.add_scalar(f"{name}/{label}Ms", value, step)
+        if self.printReport:
+            print("\n".join(lines))
+        if self.csvFile is not None:
+            self.csvFile.flush()
+
+        for section in self.sections.values():
+            section.samples.clear()
+        self.counters.clear()
+        self.lastReport = now
+
+    def close(self):
+        if self.counters or any(s.samples for s in self.sections.values()):
+            self.report()
+        if self.csvFile is not None:
+            self.csvFile.close()
+            self.csvFile = None
+        if self.tensorboard is not None:
+            self.tensorboard.close()
+            self.tensorboard = None
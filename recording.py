@@ -0,0 +1,118 @@
+# recording.py
+import argparse
+import struct
+import zlib
+import numpy as np
+from environment import PongEnv
+
+# File layout (little endian):
+#   header  "PONGREC" + version byte, seed (int64), frameSkip (uint16), steps (uint32)
+#   body    zlib-compressed actions, one byte per decision: playerAction * 3 + opponentAction
+#   footer  PongEnv.snapshot() after the last step, 8 x int32
+MAGIC = b"PONGREC"
+VERSION = 1
+HEADER = struct.Struct("<7sBqHI")
+FOOTER = struct.Struct("<8i")
+
+
+class Recording:
+    def __init__(self, seed, frameSkip, actions, finalSnapshot):
+        """An episode as its seed, per-decision action codes and the expected final physics state."""
+        self.seed = seed
+        self.frameSkip = frameSkip
+        self.actions = actions
+        self.finalSnapshot = finalSnapshot
+
+    def __len__(self):
+        return len(self.actions)
+
+
+class EpisodeRecorder:
+    def __init__(self, env, seed):
+        """Reseed and reset env to start a reproducible episode, then collect its actions."""
+        self.env = env
+        self.seed = seed
+        self.actions = bytearray()
+        env.seed(seed)
+        env.reset()
+
+    def record(self, playerAction, opponentAction):
+        """Log one decision; call once per env.step with the same actions."""
+        self.actions.append(int(playerAction) * 3 + int(opponentAction))
+
+    def recording(self):
+        return Recording(self.seed, self.env.frameSkip, np.frombuffer(bytes(self.actions), dtype=np.uint8),
+                         self.env.snapshot())
+
+    def save(self, path):
+        """Write the episode so far; the env's current state becomes the expected final state."""
+        saveRecording(self.recording(), path)
+
+
+def saveRecording(recording, path):
+    body = zlib.compress(np.asarray(recording.actions, dtype=np.uint8).tobytes(), 9)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, recording.seed, recording.frameSkip, len(recording.actions)))
+        f.write(body)
+        f.write(FOOTER.pack(*recording.finalSnapshot))
+
+
+def loadRecording(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed, frameSkip, steps = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} Pong recording")
+    actions = np.frombuffer(zlib.decompress(data[HEADER.size:-FOOTER.size]), dtype=np.uint8)
+    if len(actions) != steps:
+        raise ValueError(f"{path} is truncated: expected {steps} actions, found {len(actions)}")
+    return Recording(seed, frameSkip, actions, FOOTER.unpack_from(data, len(data) - FOOTER.size))
+
+
+def replay(recording, env=None, render=False, fps=60):
+    """Re-simulate a recording (headless by default) and return the env in its final state."""
+    if isinstance(recording, str):
+        recording = loadRecording(recording)
+    env = env or PongEnv(headless=True)
+    env.frameSkip = recording.frameSkip
+    env.seed(recording.seed)
+    env.reset()
+    clock = None
+    if render:
+        from environment import loadPygame
+        clock = loadPygame().time.Clock()
+    for code in recording.actions.tolist():
+        env.step(code // 3, code % 3)
+        if render:
+            env.render(episode=0)
+            clock.tick(fps)
+    return env
+
+
+def verify(recording):
+    """True if re-simulating the recording reproduces its stored final state exactly."""
+    if isinstance(recording, str):
+        recording = loadRecording(recording)
+    return replay(recording).snapshot() == tuple(recording.finalSnapshot)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect, verify or watch recorded Pong episodes")
+    parser.add_argument("command", choices=("info", "verify", "watch"))
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--fps", type=int, default=60)
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.paths:
+        recording = loadRecording(path)
+        if args.command == "info":
+            print(f"{path}: seed {recording.seed}, {len(recording)} decisions, frameSkip {recording.frameSkip}, "
+                  f"final score {recording.finalSnapshot[0]}-{recording.finalSnapshot[1]}")
+        elif args.command == "verify":
+            ok = verify(recording)
+            failed += not ok
+            print(f"{path}: {'OK' if ok else 'MISMATCH'}")
+        else:
+            replay(recording, PongEnv(), render=True, fps=args.fps).close()
+    raise SystemExit(1 if failed else 0)
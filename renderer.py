@@ -0,0 +1,122 @@
+# renderer.py
+import multiprocessing as mp
+import queue
+from environment import PongEnv, loadPygame
+
+
+class Renderer:
+    def __init__(self, env, screen):
+        """Draws a PongEnv onto screen, updating only the parts of the window that changed.
+
+        The background (black fill and centre line) is pre-rendered once and text surfaces
+        are cached until their value changes. Each frame the previous paddle, ball and text
+        rectangles are restored from the background, the new ones drawn, and only those
+        rectangles are pushed to the display. Anything else drawn to the screen (e.g. a game
+        over message) needs invalidate() so the next frame repaints everything.
+        """
+        self.pygame = loadPygame()
+        self.env = env
+        self.screen = screen
+        self.font = env.font
+        self.background = self.pygame.Surface(screen.get_size()).convert()
+        self.background.fill(env.BLACK)
+        self.drawCentreLine(self.background)
+        self.textCache = {}  # name -> (value, surface)
+        self.previous = []  # Rects drawn last frame
+        self.fullRedraw = True
+
+    def drawCentreLine(self, surface):
+        self.pygame.draw.aaline(surface, self.env.WHITE, (self.env.WIDTH // 2, 0), (self.env.WIDTH // 2, self.env.HEIGHT))
+
+    def invalidate(self):
+        """Repaint the whole window on the next frame."""
+        self.fullRedraw = True
+
+    def text(self, name, value, antialias, colour):
+        cached = self.textCache.get(name)
+        if cached is None or cached[0] != value:
+            cached = self.textCache[name] = (value, self.font.render(str(value), antialias, colour))
+        return cached[1]
+
+    def draw(self, episode):
+        pg = self.pygame
+        env = self.env
+        screen = self.screen
+        texts = (
+            (self.text("player", env.playerScore, False, env.WHITE), (env.WIDTH // 4, 20)),
+            (self.text("episode", f"Episode: {episode}", True, env.RED), (300, 550)),
+            (self.text("opponent", env.opponentScore, False, env.WHITE), (3 * env.WIDTH // 4, 20)),
+        )
+        objects = [pg.Rect(env.player.asTuple()), pg.Rect(env.opponent.asTuple()), pg.Rect(env.ball.asTuple())]
+        current = objects + [surface.get_rect(topleft=position) for surface, position in texts]
+
+        if self.fullRedraw:
+            screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.previous:
+                screen.blit(self.background, rect, rect)
+        # Same draw order as a full repaint, so partial and full frames are pixel-identical
+        pg.draw.rect(screen, env.WHITE, objects[0])
+        pg.draw.rect(screen, env.WHITE, objects[1])
+        pg.draw.ellipse(screen, env.WHITE, objects[2])
+        self.drawCentreLine(screen)
+        for surface, position in texts:
+            screen.blit(surface, position)
+
+        if self.fullRedraw:
+            pg.display.flip()
+            self.fullRedraw = False
+        else:
+            pg.display.update(self.previous + current)
+        self.previous = current
+
+
+def runSpectator(snapshots, fps):
+    """Viewer process: draw each published snapshot until told to stop or the window is closed."""
+    env = PongEnv()
+    pg = loadPygame()
+    clock = pg.time.Clock()
+    while True:
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                env.close()
+                return
+        try:
+            snapshot, episode = snapshots.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        if snapshot is None:
+            env.close()
+            return
+        env.restore(snapshot)
+        env.render(episode)
+        clock.tick(fps)
+
+
+class Spectator:
+    def __init__(self, fps=60):
+        """Watch a headless run in a separate window process.
+
+        publish() hands the env's integer snapshot to the viewer without ever blocking:
+        if the viewer is still drawing the previous frame the new one is dropped, so the
+        training loop pays only for a tuple put on a queue.
+        """
+        ctx = mp.get_context("spawn")
+        self.snapshots = ctx.Queue(maxsize=1)
+        self.process = ctx.Process(target=runSpectator, args=(self.snapshots, fps), daemon=True)
+        self.process.start()
+
+    def publish(self, env, episode):
+        try:
+            self.snapshots.put_nowait((env.snapshot(), episode))
+        except queue.Full:
+            pass
+
+    def close(self):
+        try:
+            self.snapshots.put((None, 0), timeout=1.0)
+        except queue.Full:
+            pass
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
@@ -0,0 +1,27 @@
+# scripted.py
+
+
+class ScriptedPolicy:
+    def __init__(self, env, side='opponent', deadZone=None):
+        """Rule-based paddle that moves to where the ball will arrive, using PongEnv.predictIntercept.
+
+        Costs one cached lookup per frame instead of a network forward pass, so it is a cheap
+        opponent to train against and a fixed baseline to evaluate against.
+        """
+        self.env = env
+        self.side = side
+        self.deadZone = env.PADDLESPEED if deadZone is None else deadZone
+
+    def act(self, state=None):
+        """Return 0 (up), 1 (down) or 2 (stay); state is accepted for drop-in use but not needed."""
+        env = self.env
+        paddle = env.player if self.side == 'player' else env.opponent
+        target = env.predictIntercept(self.side)
+        if target is None:
+            target = env.HEIGHT / 2  # Ball heading away: drift back to the middle
+        centre = paddle.y + paddle.height / 2
+        if target < centre - self.deadZone:
+            return 0
+        if target > centre + self.deadZone:
+            return 1
+        return 2
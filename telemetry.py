@@ -0,0 +1,243 @@
+# telemetry.py
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+
+
+class TelemetryWriter:
+    def __init__(self, path, flushEvery=2.0, maxPending=100_000):
+        """Append-only JSON-lines metrics log written on a background thread.
+
+        log() only puts a record on an in-memory queue, so the training loop never waits
+        on the disk. The thread writes whatever has accumulated in one go and flushes at
+        most every flushEvery seconds. If the queue ever holds maxPending records, new ones
+        are dropped and counted in self.dropped rather than blocking the caller.
+        """
+        self.path = path
+        self.flushEvery = flushEvery
+        self.pending = queue.Queue(maxsize=maxPending)
+        self.dropped = 0
+        self.start = time.time()
+        self.error = None
+        self.file = open(path, "a", buffering=1 << 16)
+        self.thread = threading.Thread(target=self._run, name="TelemetryWriter", daemon=True)
+        self.thread.start()
+
+    def log(self, kind, **fields):
+        """Record one row, e.g. log("episode", episode=12, reward=3, epsilon=0.4)."""
+        if self.error is not None:
+            raise RuntimeError("Telemetry writer failed") from self.error
+        try:
+            self.pending.put_nowait((time.time() - self.start, kind, fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        lastFlush = time.perf_counter()
+        while True:
+            try:
+                item = self.pending.get(timeout=self.flushEvery)
+            except queue.Empty:
+                item = ()
+            try:
+                lines = []
+                # Drain everything already queued so each wake-up is a single write
+                while item is not None:
+                    if item:
+                        wallTime, kind, fields = item
+                        lines.append(json.dumps({"kind": kind, "t": round(wallTime, 3), **fields},
+                                                separators=(",", ":")))
+                    try:
+                        item = self.pending.get_nowait()
+                    except queue.Empty:
+                        break
+                if lines:
+                    self.file.write("\n".join(lines) + "\n")
+                now = time.perf_counter()
+                if item is None or now - lastFlush >= self.flushEvery:
+                    self.file.flush()
+                    lastFlush = now
+                if item is None:
+                    return
+            except Exception as e:
+                self.error = e
+                return
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        self.file.close()
+        if self.dropped:
+            print(f"Telemetry: dropped {self.dropped} records ({self.path})")
+
+
+def readRecords(path, kind=None):
+    """Stream records from a log one line at a time; a torn last line (run still writing) is skipped."""
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if kind is None or record.get("kind") == kind:
+                yield record
+
+
+class RunningStats:
+    """Count, mean, standard deviation, min, max and last value in O(1) memory (Welford)."""
+    __slots__ = ("n", "mean", "m2", "min", "max", "last")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = None
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+
+def summarize(path, kind=None, lastN=None):
+    """Per-kind, per-field RunningStats over the whole log, plus the same over the last lastN records."""
+    totals = {}
+    recent = {}
+    for record in readRecords(path, kind):
+        recordKind = record["kind"]
+        fields = totals.setdefault(recordKind, {})
+        for name, value in record.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                fields.setdefault(name, RunningStats()).add(value)
+        if lastN:
+            recent.setdefault(recordKind, deque(maxlen=lastN)).append(record)
+
+    recentStats = {}
+    for recordKind, records in recent.items():
+        fields = recentStats[recordKind] = {}
+        for record in records:
+            for name, value in record.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    fields.setdefault(name, RunningStats()).add(value)
+    return totals, recentStats
+
+
+class Downsampler:
+    def __init__(self, maxBuckets=2000):
+        """Fixed-memory series reduction for plotting logs of any length.
+
+        Points go into buckets of bucketSize consecutive values holding the mean x, mean y,
+        min y and max y; when the bucket count passes maxBuckets, neighbouring buckets are
+        merged and bucketSize doubles.
+        """
+        self.maxBuckets = maxBuckets
+        self.bucketSize = 1
+        self.buckets = []  # [sumX, sumY, count, minY, maxY]
+
+    def add(self, x, y):
+        last = self.buckets[-1] if self.buckets else None
+        if last is None or last[2] >= self.bucketSize:
+            self.buckets.append([x, y, 1, y, y])
+            if len(self.buckets) > self.maxBuckets:
+                self.merge()
+        else:
+            last[0] += x
+            last[1] += y
+            last[2] += 1
+            last[3] = min(last[3], y)
+            last[4] = max(last[4], y)
+
+    def merge(self):
+        merged = []
+        for i in range(0, len(self.buckets), 2):
+            pair = self.buckets[i:i + 2]
+            merged.append([sum(b[0] for b in pair), sum(b[1] for b in pair), sum(b[2] for b in pair),
+                           min(b[3] for b in pair), max(b[4] for b in pair)])
+        self.buckets = merged
+        self.bucketSize *= 2
+
+    def series(self):
+        """(x, meanY, minY, maxY) lists, one entry per bucket."""
+        xs = [b[0] / b[2] for b in self.buckets]
+        ys = [b[1] / b[2] for b in self.buckets]
+        return xs, ys, [b[3] for b in self.buckets], [b[4] for b in self.buckets]
+
+
+def plot(path, fields, output, kind="episode", xField=None, maxPoints=2000):
+    """Plot fields of one record kind against xField (record index if None) in one streaming pass."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    series = {name: Downsampler(maxPoints) for name in fields}
+    for index, record in enumerate(readRecords(path, kind)):
+        x = record.get(xField, index) if xField else index
+        for name, sampler in series.items():
+            value = record.get(name)
+            if value is not None:
+                sampler.add(x, value)
+
+    figure, axes = plt.subplots(len(fields), 1, sharex=True, figsize=(10, 2.5 * len(fields)), squeeze=False)
+    for axis, (name, sampler) in zip(axes[:, 0], series.items()):
+        xs, ys, lows, highs = sampler.series()
+        axis.fill_between(xs, lows, highs, alpha=0.25, linewidth=0)
+        axis.plot(xs, ys, linewidth=1)
+        axis.set_ylabel(name)
+        axis.grid(alpha=0.3)
+    axes[-1, 0].set_xlabel(xField or f"{kind} index")
+    figure.tight_layout()
+    figure.savefig(output, dpi=120)
+    plt.close(figure)
+
+
+def printSummary(totals, recent, lastN):
+    for kind, fields in sorted(totals.items()):
+        count = max(stats.n for stats in fields.values())
+        print(f"[{kind}] {count} records")
+        print(f"  {'field':<16}{'mean':>12}{'std':>12}{'min':>12}{'max':>12}{'last':>12}"
+              + (f"{f'last {lastN} mean':>16}" if lastN else ""))
+        for name, stats in fields.items():
+            if name == "t":
+                continue
+            row = f"  {name:<16}{stats.mean:>12.4g}{stats.std:>12.4g}{stats.min:>12.4g}{stats.max:>12.4g}{stats.last:>12.4g}"
+            if lastN and name in recent.get(kind, {}):
+                row += f"{recent[kind][name].mean:>16.4g}"
+            print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize or plot a telemetry log without loading it into memory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summaryParser = subparsers.add_parser("summary", help="per-field statistics for each record kind")
+    summaryParser.add_argument("path")
+    summaryParser.add_argument("--kind", help="only this record kind (e.g. episode, steps)")
+    summaryParser.add_argument("--last", type=int, default=100, help="also show the mean over the last N records")
+    plotParser = subparsers.add_parser("plot", help="downsampled mean and min/max band per field")
+    plotParser.add_argument("path")
+    plotParser.add_argument("fields", nargs="+")
+    plotParser.add_argument("--kind", default="episode")
+    plotParser.add_argument("--x", help="field to use as the x axis (default: record index)")
+    plotParser.add_argument("--points", type=int, default=2000, help="maximum plotted points per field")
+    plotParser.add_argument("--output", default="telemetry.png")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        totals, recent = summarize(args.path, args.kind, args.last)
+        printSummary(totals, recent, args.last)
+    else:
+        plot(args.path, args.fields, args.output, args.kind, args.x, args.points)
+        print(f"Wrote {args.output}")